@@ -3,6 +3,12 @@ def __getattr__(name: str):
     if name == "SupportAgent":
         from .core import SupportAgent
         return SupportAgent
+    if name == "SQLGeneratorAgent":
+        from .sql_generator import SQLGeneratorAgent
+        return SQLGeneratorAgent
+    if name == "SQLReviewerAgent":
+        from .sql_reviewer import SQLReviewerAgent
+        return SQLReviewerAgent
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ["SupportAgent"]
+__all__ = ["SupportAgent", "SQLGeneratorAgent", "SQLReviewerAgent"]
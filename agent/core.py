@@ -1,10 +1,16 @@
 import asyncio
 import os
-import json
-from typing import Any, Callable, cast
+import re
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterable, cast
+
+import orjson
 
 from openai import AsyncOpenAI, APIError, APIConnectionError, RateLimitError
 from openai.types.responses import ResponseInputItemParam, EasyInputMessageParam
+from openai.types.shared import ReasoningEffort
+from pydantic import BaseModel
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -12,7 +18,14 @@ from tenacity import (
     retry_if_exception_type,
 )
 
-from tools import TOOLS, handle_tool_call
+from database import sql_batch
+from tools import TOOLS, TOOLS_USING_DATABASE, handle_tool_call
+
+from .openai_client import get_client, lowest_effort
+from .semantic_cache import SemanticCache, namespace_for
+
+# Output item type of a tool call requested by the model
+FUNCTION_CALL = "function_call"
 
 # Callback type for tool call notifications
 ToolCallCallback = Callable[[str, dict], None]
@@ -20,9 +33,27 @@ ToolCallCallback = Callable[[str, dict], None]
 # Callback type for agent activity notifications
 AgentCallback = Callable[[str, str, dict], None]
 
+# Callback type for streamed response text deltas
+TextCallback = Callable[[str], None]
+
 # Configuration
-MAX_CONVERSATION_ITEMS = 40  # ~20 turns (user + assistant)
+MAX_HISTORY_TOKENS = 16000  # Estimated tokens of history sent per request
+SUMMARIZE_AFTER_TURNS = 4  # Evicted turns folded into the summary at once
 TOOL_TIMEOUT_SECONDS = 30.0
+COMPLEX_HISTORY_ITEMS = 20  # History length where follow-ups need more reasoning
+COMPLEX_MESSAGE_CHARS = 300
+
+# Questions answered by a single direct lookup
+_LOOKUP_RE = re.compile(
+    r"\border\s*#?\s*\d+|\bwhere is my (?:order|package)|\btrack"
+    r"|\bin stock\b|\bhow much\b",
+    re.IGNORECASE,
+)
+# Questions answered from policy documents
+_POLICY_RE = re.compile(
+    r"\b(?:return|refund|shipping|warranty|exchange|polic(?:y|ies))",
+    re.IGNORECASE,
+)
 
 
 INSTRUCTIONS = """You are a customer support agent for an e-commerce company.
@@ -46,6 +77,85 @@ Guidelines:
 - Do not engage in general conversation, jokes, or off-topic discussions
 - If you cannot find the requested information, acknowledge it and offer alternatives"""
 
+# Static system message pinned at the head of every request input. Keeping the
+# prefix byte-identical across turns and tool rounds lets OpenAI prompt caching
+# reuse it instead of re-prefilling the whole conversation.
+SYSTEM_MESSAGE: EasyInputMessageParam = {"role": "system", "content": INSTRUCTIONS}
+
+# Tool schemas in a fixed order, as they are part of the cached prompt prefix
+REQUEST_TOOLS = sorted(TOOLS, key=lambda tool: tool["name"])
+
+SUMMARY_INSTRUCTIONS = """Summarize this earlier part of a customer support conversation.
+Keep customer names, emails, order numbers, products and any decisions or open questions.
+Respond with the summary only, in a few short sentences."""
+
+
+def _estimate_tokens(item: Any) -> int:
+    """Estimate the tokens of a conversation item (about four bytes each)."""
+    if isinstance(item, BaseModel):
+        return len(item.model_dump_json()) // 4
+    return len(orjson.dumps(item, default=str)) // 4
+
+
+def _is_user_message(item: Any) -> bool:
+    """Check if a conversation item is a user message, which starts a turn."""
+    return isinstance(item, dict) and item.get("role") == "user"
+
+
+def _render_item(item: Any) -> str | None:
+    """Render a conversation item as a transcript line for summarization."""
+    if isinstance(item, dict):
+        if "content" in item:
+            return f"{item['role']}: {item['content']}"
+        if item.get("type") == "function_call_output":
+            return f"tool result: {item['output']}"
+    elif item.type == "message":
+        text = "".join(getattr(part, "text", "") for part in item.content)
+        return f"assistant: {text}"
+    elif item.type == FUNCTION_CALL:
+        return f"tool call: {item.name}({item.arguments})"
+    return None
+
+
+async def _raise(error: Exception) -> str:
+    """Raise error once awaited, to fail a tool call like its handler would."""
+    raise error
+
+
+class _StreamInterrupted(Exception):
+    """Raised when a stream fails after passing on text, so it isn't retried."""
+
+
+class _RoundTimeout(Exception):
+    """Stands in for the result of a tool call cut off by the round timeout."""
+
+
+def _task_outcome(task: asyncio.Task[str]) -> str | BaseException:
+    """Return a finished tool task's result, or the exception it ended with."""
+    if task.cancelled():
+        return RuntimeError("tool call was cancelled")
+    return task.exception() or task.result()
+
+
+def _pick_effort(user_message: str, history_len: int, model: str) -> ReasoningEffort:
+    """
+    Pick the reasoning effort for a turn from a cheap complexity heuristic.
+
+    Direct lookups get the lowest effort the model accepts, policy questions
+    low, and anything long, open-ended or deep into a conversation keeps
+    medium.
+    """
+    if (
+        history_len > COMPLEX_HISTORY_ITEMS
+        or len(user_message) > COMPLEX_MESSAGE_CHARS
+    ):
+        return "medium"
+    if _POLICY_RE.search(user_message):
+        return "low"
+    if _LOOKUP_RE.search(user_message):
+        return lowest_effort(model)
+    return "medium"
+
 
 class SupportAgent:
     """Customer support agent using OpenAI Responses API with tool calling."""
@@ -55,6 +165,9 @@ class SupportAgent:
         model: str | None = None,
         on_tool_call: ToolCallCallback | None = None,
         on_agent_activity: AgentCallback | None = None,
+        semantic_cache: SemanticCache | None = None,
+        stream: bool = False,
+        client: AsyncOpenAI | None = None,
     ):
         """
         Initialize the support agent.
@@ -65,12 +178,33 @@ class SupportAgent:
                           Receives (tool_name, arguments_dict).
             on_agent_activity: Optional callback for sub-agent activity notifications.
                                Receives (agent_name, action, details_dict).
+            semantic_cache: Optional cache for answers to questions that
+                            needed no tool calls.
+            stream: Stream responses and start each tool call as soon as the
+                    model finishes emitting it, instead of after the whole
+                    response is complete.
+            client: OpenAI client to use. Defaults to the shared client,
+                    resolved on first use.
         """
-        self.client = AsyncOpenAI()
+        self._client = client
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-5-mini")
-        self.conversation: list[ResponseInputItemParam] = []
+        self.conversation: deque[ResponseInputItemParam] = deque()
+        self.summary: str | None = None
+        self._token_estimate = 0
+        self._evicted: list[ResponseInputItemParam] = []
+        self._evicted_turns = 0
         self.on_tool_call = on_tool_call
         self.on_agent_activity = on_agent_activity
+        self.semantic_cache = semantic_cache
+        self.stream = stream
+        self._effort: ReasoningEffort = "medium"
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared OpenAI client, resolved on first use."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
 
     async def chat(self, user_message: str) -> str:
         """
@@ -82,72 +216,349 @@ class SupportAgent:
         Returns:
             The agent's response
         """
+        return await self._chat(user_message)
+
+    async def chat_stream(self, user_message: str) -> AsyncIterator[str]:
+        """
+        Process a user message and yield the response text as it arrives.
+
+        Responses are always streamed, so the first words of the answer are
+        yielded while the model is still generating. Answers that produce no
+        deltas, like semantic cache hits, are yielded in one piece.
+
+        Args:
+            user_message: The user's input message
+
+        Yields:
+            Text deltas of the agent's response
+        """
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        task = asyncio.create_task(self._chat(user_message, queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        streamed = False
+        try:
+            while (delta := await queue.get()) is not None:
+                streamed = True
+                yield delta
+            answer = await task
+        finally:
+            task.cancel()
+
+        if not streamed and answer:
+            yield answer
+
+    async def _chat(
+        self, user_message: str, on_text: TextCallback | None = None
+    ) -> str:
+        """Run one turn, passing streamed text deltas to on_text if given."""
+        # Answers can draw on earlier turns, such as an order looked up
+        # before, so only opening questions are shared through the cache
+        cacheable = not self.conversation and self.summary is None
+
         user_msg: EasyInputMessageParam = {"role": "user", "content": user_message}
-        self.conversation.append(user_msg)
+        self._add_to_conversation(user_msg)
+
+        # Serve repeated pure Q&A turns from the semantic cache
+        embedding = None
+        if self.semantic_cache and cacheable:
+            embedding = await self.semantic_cache.embed(user_message)
+            cached_answer = self.semantic_cache.get(embedding, self._cache_namespace)
+            if cached_answer is not None:
+                answer_msg: EasyInputMessageParam = {
+                    "role": "assistant",
+                    "content": cached_answer,
+                }
+                self._add_to_conversation(answer_msg)
+                return cached_answer
 
-        # Truncate conversation if too long to avoid token limits
+        # Evict old turns if history is over budget to bound prefill cost
         self._truncate_conversation()
+        if self._evicted_turns >= SUMMARIZE_AFTER_TURNS:
+            await self._summarize_evicted()
 
         # Call OpenAI Responses API with retry
-        response = await self._call_api()
+        self._effort = _pick_effort(
+            user_message, len(self.conversation), self.model
+        )
+        response, tool_outputs = await self._run_round(on_text=on_text)
 
         # Process output items - handle function calls
-        while self._has_function_calls(response.output):
-            # Execute function calls and collect results
-            tool_outputs = await self._process_function_calls(response.output)
+        used_tools = False
+        while tool_outputs:
+            used_tools = True
 
             # Add outputs to conversation and get next response
-            self.conversation.extend(
-                cast(list[ResponseInputItemParam], response.output)
+            self._add_to_conversation(
+                *cast(list[ResponseInputItemParam], response.output),
+                *tool_outputs,
             )
-            self.conversation.extend(tool_outputs)
 
-            response = await self._call_api()
+            # Chain onto the previous response so only the new tool outputs
+            # are uploaded instead of the whole conversation
+            response, tool_outputs = await self._run_round(
+                response.id, tool_outputs, on_text
+            )
 
         # Add final response to conversation history
-        self.conversation.extend(cast(list[ResponseInputItemParam], response.output))
+        self._add_to_conversation(
+            *cast(list[ResponseInputItemParam], response.output)
+        )
+
+        # Tool-backed answers depend on live data, so only cache pure Q&A
+        if embedding is not None and not used_tools:
+            self.semantic_cache.put(
+                embedding, self._cache_namespace, response.output_text
+            )
 
         return response.output_text
 
+    @property
+    def _cache_namespace(self) -> str:
+        """Semantic cache namespace for this agent's model and instructions."""
+        return namespace_for(self.model, INSTRUCTIONS)
+
+    def _request_input(self) -> list[ResponseInputItemParam]:
+        """Build request input: pinned system prompt, summary, then history."""
+        request_input: list[ResponseInputItemParam] = [SYSTEM_MESSAGE]
+        if self.summary:
+            summary_msg: EasyInputMessageParam = {
+                "role": "system",
+                "content": f"Prior context summary: {self.summary}",
+            }
+            request_input.append(summary_msg)
+        request_input.extend(self.conversation)
+        return request_input
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
         retry=retry_if_exception_type((APIError, APIConnectionError, RateLimitError)),
         reraise=True,
     )
-    async def _call_api(self):
+    async def _call_api(
+        self,
+        previous_response_id: str | None = None,
+        new_items: list[ResponseInputItemParam] | None = None,
+    ):
         """Call OpenAI API with retry logic for transient failures."""
         return await self.client.responses.create(
-            model=self.model,
-            instructions=INSTRUCTIONS,
-            input=self.conversation,
-            tools=TOOLS,
-            reasoning={"effort": "medium"},
+            **self._request_params(previous_response_id, new_items)
         )
 
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        retry=retry_if_exception_type((APIError, APIConnectionError, RateLimitError)),
+        reraise=True,
+    )
+    async def _stream_api(
+        self,
+        previous_response_id: str | None = None,
+        new_items: list[ResponseInputItemParam] | None = None,
+        on_text: TextCallback | None = None,
+    ) -> tuple[Any, dict[tuple[str, str], asyncio.Task]]:
+        """
+        Stream a response, starting tool calls as soon as each one is complete.
+
+        Text deltas are passed to on_text as they arrive. Returns the final
+        response and the already running tool tasks keyed by
+        (name, arguments). A stream failing after text was passed on is
+        not retried, as the retry would pass the same text on again.
+        """
+        started: dict[tuple[str, str], asyncio.Task] = {}
+        emitted = False
+        try:
+            async with self.client.responses.stream(
+                **self._request_params(previous_response_id, new_items)
+            ) as stream:
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        if on_text:
+                            emitted = True
+                            on_text(event.delta)
+                    elif (
+                        event.type == "response.output_item.done"
+                        and event.item.type == FUNCTION_CALL
+                    ):
+                        key = (event.item.name, event.item.arguments)
+                        if key not in started:
+                            started[key] = asyncio.create_task(
+                                self._start_tool(*key)
+                            )
+                return await stream.get_final_response(), started
+        except BaseException as e:
+            # A failed or retried stream must not leave tools running
+            for task in started.values():
+                task.cancel()
+            if emitted and isinstance(e, Exception):
+                raise _StreamInterrupted(f"Response stream interrupted: {e}") from e
+            raise
+
+    async def _run_round(
+        self,
+        previous_response_id: str | None = None,
+        new_items: list[ResponseInputItemParam] | None = None,
+        on_text: TextCallback | None = None,
+    ) -> tuple[Any, list[ResponseInputItemParam]]:
+        """
+        Get the next response and run the tool calls it makes.
+
+        Returns the response and the tool output items, empty when it made
+        no calls. Streamed responses start tools before the calls are all
+        known, so the whole round runs in one sql_batch for them to join.
+        """
+        streaming = self.stream or on_text is not None
+        async with sql_batch() if streaming else nullcontext():
+            response, started = await self._next_response(
+                previous_response_id, new_items, on_text
+            )
+            function_calls = self._extract_function_calls(response.output)
+            if not function_calls:
+                return response, []
+            return response, await self._process_function_calls(
+                function_calls, started
+            )
+
+    async def _next_response(
+        self,
+        previous_response_id: str | None = None,
+        new_items: list[ResponseInputItemParam] | None = None,
+        on_text: TextCallback | None = None,
+    ) -> tuple[Any, dict[tuple[str, str], asyncio.Task]]:
+        """
+        Get the next response and any tool tasks started while streaming.
+
+        With previous_response_id, the request continues that stored response
+        and sends only new_items as input. Passing on_text forces streaming.
+        """
+        if self.stream or on_text is not None:
+            return await self._stream_api(previous_response_id, new_items, on_text)
+        return await self._call_api(previous_response_id, new_items), {}
+
+    def _request_params(
+        self,
+        previous_response_id: str | None,
+        new_items: list[ResponseInputItemParam] | None,
+    ) -> dict[str, Any]:
+        """Build Responses API parameters for a fresh or chained request."""
+        params: dict[str, Any] = {
+            "model": self.model,
+            "tools": REQUEST_TOOLS,
+            "reasoning": {"effort": self._effort},
+        }
+        if previous_response_id is None:
+            params["input"] = self._request_input()
+        else:
+            params["previous_response_id"] = previous_response_id
+            params["input"] = new_items or []
+        return params
+
+    def _add_to_conversation(self, *items: ResponseInputItemParam) -> None:
+        """Append items to the conversation and track its token estimate."""
+        for item in items:
+            self.conversation.append(item)
+            self._token_estimate += _estimate_tokens(item)
+
     def _truncate_conversation(self) -> None:
-        """Truncate conversation to prevent token overflow."""
-        if len(self.conversation) > MAX_CONVERSATION_ITEMS:
-            # Keep the most recent items
-            self.conversation = self.conversation[-MAX_CONVERSATION_ITEMS:]
+        """
+        Evict the oldest whole turns while history is over the token budget.
+
+        Turns are evicted from their user message up to the next one, so a
+        function call is never separated from its output. The current turn
+        is always kept. Evicted items are held for _summarize_evicted().
+        """
+        while self._token_estimate > MAX_HISTORY_TOKENS:
+            next_turn = next(
+                (
+                    i
+                    for i, item in enumerate(self.conversation)
+                    if i > 0 and _is_user_message(item)
+                ),
+                None,
+            )
+            if next_turn is None:
+                break
+
+            for _ in range(next_turn):
+                item = self.conversation.popleft()
+                self._token_estimate -= _estimate_tokens(item)
+                self._evicted.append(item)
+            self._evicted_turns += 1
+
+    async def _summarize_evicted(self) -> None:
+        """Fold evicted turns and the previous summary into a new summary."""
+        lines = [f"Earlier summary: {self.summary}"] if self.summary else []
+        lines.extend(
+            line
+            for line in map(_render_item, self._evicted)
+            if line is not None
+        )
+        self._evicted = []
+        self._evicted_turns = 0
 
-    def _has_function_calls(self, output: list[Any]) -> bool:
-        """Check if output contains any function calls."""
-        return any(item.type == "function_call" for item in output)
+        summary_msg: EasyInputMessageParam = {
+            "role": "user",
+            "content": "\n".join(lines),
+        }
+        try:
+            response = await self.client.responses.create(
+                model=self.model,
+                instructions=SUMMARY_INSTRUCTIONS,
+                input=[summary_msg],
+                reasoning={"effort": lowest_effort(self.model)},
+            )
+        except (APIError, APIConnectionError, RateLimitError):
+            # Losing some early context is better than failing the turn
+            return
+
+        self.summary = response.output_text.strip()
+
+    def _extract_function_calls(self, output: list[Any]) -> list[Any]:
+        """Return the function call items in output, in order."""
+        return [item for item in output if item.type == FUNCTION_CALL]
 
     async def _process_function_calls(
-        self, output: list[Any]
+        self,
+        function_calls: list[Any],
+        started: dict[tuple[str, str], asyncio.Task] | None = None,
     ) -> list[ResponseInputItemParam]:
-        """Execute function calls and return output items."""
-        tasks = []
-        call_ids = []
+        """
+        Execute function calls and return output items.
 
-        for item in output:
-            if item.type == "function_call":
-                call_ids.append(item.call_id)
-                tasks.append(self._execute_tool(item.name, item.arguments))
+        function_calls must already be filtered by _extract_function_calls().
 
-        results = await asyncio.gather(*tasks)
+        Every new call is announced to on_tool_call before any of them is
+        awaited, then all run concurrently. Calls already running in started
+        (keyed by name and arguments) were announced when they started and
+        are awaited instead of executed again.
+        """
+        started = started or {}
+        # Identical calls in a round share one execution, keyed by
+        # (name, arguments); call_keys keeps every call_id in output order
+        pending: dict[tuple[str, str], Awaitable[str]] = {}
+        call_keys: list[tuple[str, tuple[str, str]]] = []
+
+        for item in function_calls:
+            key = (item.name, item.arguments)
+            if key not in pending:
+                pending[key] = started.get(key) or self._start_tool(*key)
+            call_keys.append((item.call_id, key))
+
+        # Rounds with several database tools share one connection and
+        # transaction; a lone query keeps using the thread's read connection,
+        # unless the round already runs in a batch.
+        calls = pending.values()
+        if sum(name in TOOLS_USING_DATABASE for name, _ in pending) > 1:
+            async with sql_batch():
+                results = await self._run_tools(calls)
+        else:
+            results = await self._run_tools(calls)
+
+        outputs = {
+            key: orjson.dumps(self._tool_result(key[0], result)).decode()
+            for key, result in zip(pending, results)
+        }
 
         return cast(
             list[ResponseInputItemParam],
@@ -155,27 +566,66 @@ class SupportAgent:
                 {
                     "type": "function_call_output",
                     "call_id": call_id,
-                    "output": json.dumps(result),
+                    "output": outputs[key],
                 }
-                for call_id, result in zip(call_ids, results)
+                for call_id, key in call_keys
             ],
         )
 
-    async def _execute_tool(self, name: str, arguments: str) -> str:
-        """Execute a single tool call with timeout."""
-        args = json.loads(arguments)
-
-        if self.on_tool_call:
-            self.on_tool_call(name, args)
+    async def _run_tools(
+        self, calls: Iterable[Awaitable[str]]
+    ) -> list[str | BaseException]:
+        """
+        Run tool calls concurrently under one shared timeout.
 
+        A single timer covers the whole round. Calls still running when it
+        fires are cancelled and reported as _RoundTimeout, while finished
+        calls keep their results. Exceptions are returned in place of
+        results, so a failing tool never cancels its siblings, and a call
+        cancelled from elsewhere is reported as an error like any failure.
+        """
+        tasks = [asyncio.ensure_future(call) for call in calls]
+        if not tasks:
+            return []
         try:
-            return await asyncio.wait_for(
-                handle_tool_call(name, args, self.on_agent_activity),
-                timeout=TOOL_TIMEOUT_SECONDS,
-            )
-        except asyncio.TimeoutError:
+            done, _ = await asyncio.wait(tasks, timeout=TOOL_TIMEOUT_SECONDS)
+        finally:
+            # Stops timed out calls, and every call if this task is cancelled
+            for task in tasks:
+                task.cancel()
+
+        return [_task_outcome(task) if task in done else _RoundTimeout() for task in tasks]
+
+    def _tool_result(self, name: str, result: str | BaseException) -> str:
+        """Turn a gathered tool result or exception into tool output text."""
+        if isinstance(result, _RoundTimeout):
             return f"Error: Tool '{name}' timed out after {TOOL_TIMEOUT_SECONDS}s"
+        if isinstance(result, Exception):
+            return f"Error executing {name}: {result}"
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def _start_tool(self, name: str, arguments: str) -> Coroutine[Any, Any, str]:
+        """
+        Announce a tool call and return the coroutine that executes it.
+
+        Arguments that aren't valid JSON are not announced; the coroutine
+        raises instead, so the error is reported like any tool failure.
+        """
+        try:
+            args = orjson.loads(arguments)
+        except orjson.JSONDecodeError as e:
+            return _raise(e)
+
+        if self.on_tool_call:
+            self.on_tool_call(name, args)
+        return handle_tool_call(name, args, self.on_agent_activity)
 
     def clear_history(self) -> None:
         """Clear conversation history."""
-        self.conversation = []
+        self.conversation.clear()
+        self.summary = None
+        self._token_estimate = 0
+        self._evicted = []
+        self._evicted_turns = 0
@@ -0,0 +1,70 @@
+"""Shared AsyncOpenAI client and model settings for all agents."""
+
+import os
+import re
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI
+from openai.types.shared import ReasoningEffort
+
+
+# Connection pool sized for parallel tool calls and sub-agent requests
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+DEFAULT_TIMEOUT_SECONDS = 60.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+# Models accepting "minimal" reasoning effort; others get "low" instead
+_MINIMAL_EFFORT_MODEL_RE = re.compile(r"gpt-5(?:-mini|-nano)?(?:-\d{4}-\d{2}-\d{2})?")
+
+# Shared client instances keyed by API key (initialized lazily)
+_clients: dict[str | None, AsyncOpenAI] = {}
+
+
+def get_client() -> AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client for the current OPENAI_API_KEY.
+
+    All agents share one client per API key, so the client is built once and
+    its pool of keep-alive connections saves each agent its own TCP and TLS
+    handshakes. The request timeout defaults to the OPENAI_TIMEOUT env var
+    or 60 seconds.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    client = _clients.get(api_key)
+    if client is None:
+        timeout = float(os.getenv("OPENAI_TIMEOUT", DEFAULT_TIMEOUT_SECONDS))
+        client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(
+                limits=HTTP_LIMITS,
+                timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT_SECONDS),
+            ),
+            max_retries=2,
+        )
+        _clients[api_key] = client
+    return client
+
+
+def lowest_effort(model: str) -> ReasoningEffort:
+    """Lowest reasoning effort the model accepts."""
+    return "minimal" if _MINIMAL_EFFORT_MODEL_RE.fullmatch(model) else "low"
+
+
+@lru_cache(maxsize=16)
+def schema_instructions(instructions: str, schema: str) -> str:
+    """
+    Format an agent's instructions for a schema, memoized per schema.
+
+    Trailing whitespace is stripped from each schema line so the
+    instructions prefix stays byte-identical for OpenAI prompt caching.
+    """
+    normalized = "\n".join(line.rstrip() for line in schema.strip().splitlines())
+    return instructions.format(schema=normalized)
+
+
+async def close_client() -> None:
+    """Close every shared client and its connection pool."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.close()
@@ -0,0 +1,198 @@
+"""Embedding-based semantic cache for repeated agent questions."""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from rag.embeddings import get_embedding
+
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 3600.0
+MAX_ENTRIES_PER_NAMESPACE = 1024
+MAX_MEMOIZED_EMBEDDINGS = 256
+
+
+@lru_cache(maxsize=64)
+def namespace_for(*parts: str) -> str:
+    """
+    Build a stable cache namespace from the inputs an output depends on.
+
+    Memoized, since the parts are long constant prompts and schemas that
+    would otherwise be hashed again on every cache lookup.
+    """
+    digest = hashlib.sha256("\0".join(parts).encode()).hexdigest()
+    return digest[:16]
+
+
+def _normalize(question: str) -> str:
+    """Normalize a question so trivial formatting differences share an entry."""
+    return " ".join(question.lower().split())
+
+
+@dataclass
+class _Bucket:
+    """Cached entries for one namespace, stored as an L2-normalized matrix."""
+
+    matrix: np.ndarray
+    created_at: np.ndarray
+    outputs: list[str] = field(default_factory=list)
+
+
+class SemanticCache:
+    """
+    Cache of outputs keyed by question embedding similarity.
+
+    Questions are embedded once and compared against every cached question in
+    the same namespace with a single matrix-vector product. A cached output is
+    returned when the best cosine similarity reaches the threshold and the
+    entry has not expired.
+    """
+
+    def __init__(
+        self,
+        threshold: float | None = None,
+        ttl_seconds: float | None = None,
+        path: str | None = None,
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a hit.
+                       Defaults to SEMANTIC_CACHE_THRESHOLD env var or 0.92.
+            ttl_seconds: Seconds before an entry expires.
+                         Defaults to SEMANTIC_CACHE_TTL env var or 3600.
+            path: File used by load() and save().
+                  Defaults to SEMANTIC_CACHE_PATH env var or data/sem_cache.npz.
+        """
+        if threshold is None:
+            threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("SEMANTIC_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        if path is None:
+            path = os.getenv("SEMANTIC_CACHE_PATH", "data/sem_cache.npz")
+
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.path = Path(path)
+        self._buckets: dict[str, _Bucket] = {}
+        self._embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    async def embed(self, question: str) -> np.ndarray:
+        """
+        Embed a question as an L2-normalized float32 vector.
+
+        Recent embeddings are memoized so a lookup followed by a store for
+        the same question costs a single embedding call.
+        """
+        text = _normalize(question)
+        if text in self._embeddings:
+            self._embeddings.move_to_end(text)
+            return self._embeddings[text]
+
+        vector = await asyncio.to_thread(get_embedding, text)
+        embedding = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm:
+            embedding = embedding / norm
+
+        self._embeddings[text] = embedding
+        if len(self._embeddings) > MAX_MEMOIZED_EMBEDDINGS:
+            self._embeddings.popitem(last=False)
+        return embedding
+
+    def get(self, embedding: np.ndarray, namespace: str) -> str | None:
+        """Return the cached output most similar to the embedding, if any."""
+        bucket = self._buckets.get(namespace)
+        if bucket is None or not bucket.outputs:
+            return None
+
+        scores = bucket.matrix @ embedding
+        scores[bucket.created_at < time.time() - self.ttl_seconds] = -1.0
+
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return bucket.outputs[best]
+
+    def put(self, embedding: np.ndarray, namespace: str, output: str) -> None:
+        """Store an output for the embedded question."""
+        bucket = self._buckets.get(namespace)
+        if bucket is None:
+            bucket = _Bucket(
+                matrix=np.empty((0, embedding.shape[0]), dtype=np.float32),
+                created_at=np.empty(0, dtype=np.float64),
+            )
+            self._buckets[namespace] = bucket
+        elif bucket.outputs:
+            # Refresh an existing entry instead of storing a duplicate
+            scores = bucket.matrix @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold and bucket.outputs[best] == output:
+                bucket.created_at[best] = time.time()
+                return
+
+        # Drop expired entries and keep the bucket bounded
+        keep = bucket.created_at >= time.time() - self.ttl_seconds
+        keep[: max(0, len(keep) - MAX_ENTRIES_PER_NAMESPACE + 1)] = False
+
+        bucket.matrix = np.vstack([bucket.matrix[keep], embedding[None, :]])
+        bucket.created_at = np.append(bucket.created_at[keep], time.time())
+        bucket.outputs = [o for o, k in zip(bucket.outputs, keep) if k] + [output]
+
+    def save(self) -> None:
+        """Persist all cached entries to the cache file."""
+        if not self._buckets:
+            return
+
+        arrays: dict[str, np.ndarray] = {}
+        for i, (namespace, bucket) in enumerate(self._buckets.items()):
+            arrays[f"namespace_{i}"] = np.array(namespace)
+            arrays[f"matrix_{i}"] = bucket.matrix
+            arrays[f"created_at_{i}"] = bucket.created_at
+            arrays[f"outputs_{i}"] = np.array(bucket.outputs, dtype=np.str_)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(self.path, **arrays)
+
+    def load(self) -> None:
+        """Load cached entries from the cache file if it exists."""
+        if not self.path.exists():
+            return
+
+        with np.load(self.path) as data:
+            i = 0
+            while f"namespace_{i}" in data:
+                self._buckets[str(data[f"namespace_{i}"])] = _Bucket(
+                    matrix=data[f"matrix_{i}"],
+                    created_at=data[f"created_at_{i}"],
+                    outputs=[str(o) for o in data[f"outputs_{i}"]],
+                )
+                i += 1
+
+
+# Global semantic cache instance (initialized lazily)
+_semantic_cache: SemanticCache | None = None
+
+
+def get_semantic_cache() -> SemanticCache | None:
+    """
+    Get the shared semantic cache, or None when caching is disabled.
+
+    Caching is opt-in via SEMANTIC_CACHE_ENABLED=true.
+    """
+    global _semantic_cache
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+        _semantic_cache.load()
+    return _semantic_cache
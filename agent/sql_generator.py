@@ -6,6 +6,9 @@ from typing import Callable
 from openai import AsyncOpenAI
 from openai.types.responses import ResponseInputItemParam, EasyInputMessageParam
 
+from .openai_client import get_client, schema_instructions
+from .semantic_cache import SemanticCache, namespace_for
+
 
 # Callback type for agent activity notifications
 AgentCallback = Callable[[str, str, dict], None]
@@ -35,14 +38,28 @@ class SQLGeneratorAgent:
         self,
         model: str | None = None,
         on_activity: AgentCallback | None = None,
+        semantic_cache: SemanticCache | None = None,
+        client: AsyncOpenAI | None = None,
     ):
-        """Initialize the SQL generator agent."""
-        self.client = AsyncOpenAI()
+        """Initialize the SQL generator agent, on the shared client by default."""
+        self._client = client
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-5-mini")
         self.on_activity = on_activity
+        self.semantic_cache = semantic_cache
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared OpenAI client, resolved on first use."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
 
     async def generate(
-        self, question: str, schema: str, feedback: str | None = None
+        self,
+        question: str,
+        schema: str,
+        feedback: str | None = None,
+        on_activity: AgentCallback | None = None,
     ) -> str:
         """
         Generate a SQL query for the given question.
@@ -51,18 +68,30 @@ class SQLGeneratorAgent:
             question: The natural language question to answer
             schema: The database schema
             feedback: Optional feedback from a previous attempt
+            on_activity: Activity callback for this call, overriding the
+                         agent's own, so one agent can serve every request
 
         Returns:
             A raw SQL SELECT query string
         """
         # Notify about agent activity
-        if self.on_activity:
-            self.on_activity(
+        on_activity = on_activity or self.on_activity
+        if on_activity:
+            on_activity(
                 "SQLGeneratorAgent",
                 "generating",
                 {"question": question, "has_feedback": feedback is not None},
             )
 
+        # Retries with feedback must always re-query the model
+        if self.semantic_cache and feedback is None:
+            embedding = await self.semantic_cache.embed(question)
+            cached_sql = self.semantic_cache.get(
+                embedding, self._namespace(question, schema)
+            )
+            if cached_sql is not None:
+                return cached_sql
+
         input_messages: list[ResponseInputItemParam] = []
 
         user_msg: EasyInputMessageParam = {
@@ -80,9 +109,34 @@ class SQLGeneratorAgent:
 
         response = await self.client.responses.create(
             model=self.model,
-            instructions=INSTRUCTIONS.format(schema=schema),
+            instructions=schema_instructions(INSTRUCTIONS, schema),
             input=input_messages,
             reasoning={"effort": "medium"},
         )
 
         return response.output_text.strip()
+
+    async def remember(self, question: str, schema: str, sql: str) -> None:
+        """
+        Cache a reviewed SQL query so repeats of the question can reuse it.
+
+        Args:
+            question: The natural language question that was answered
+            schema: The database schema the query was generated against
+            sql: The SQL query approved by the reviewer
+        """
+        if not self.semantic_cache:
+            return
+
+        embedding = await self.semantic_cache.embed(question)
+        self.semantic_cache.put(embedding, self._namespace(question, schema), sql)
+
+    def _namespace(self, question: str, schema: str) -> str:
+        """
+        Semantic cache namespace for a question's SQL.
+
+        Paraphrases can differ only in a customer's email or an order id,
+        which a similar embedding doesn't tell apart, so the normalized
+        question is part of the namespace and only exact repeats hit.
+        """
+        return namespace_for(self.model, schema, " ".join(question.lower().split()))
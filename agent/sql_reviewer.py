@@ -1,10 +1,16 @@
 """SQL Reviewer agent for validating SQL queries using LLM-as-judge pattern."""
 
+import hashlib
 import os
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Callable
 
 from openai import AsyncOpenAI
 from openai.types.responses import ResponseInputItemParam, EasyInputMessageParam
+from openai.types.shared import ReasoningEffort
+
+from .openai_client import get_client, lowest_effort, schema_instructions
 
 
 # Callback type for agent activity notifications
@@ -26,6 +32,32 @@ Database Schema:
 {schema}"""
 
 
+MAX_APPROVED_QUERIES = 10_000
+ESCALATE_AFTER_ATTEMPTS = 2  # Attempts reviewed at the lowest effort before medium
+
+# Keys of (schema, question, SQL) combinations the reviewer approved, in LRU order
+_approved: OrderedDict[str, None] = OrderedDict()
+
+
+def _clear_approved() -> None:
+    """Forget every approved query (used by tests)."""
+    _approved.clear()
+
+
+@lru_cache(maxsize=8)
+def _schema_digest(schema: str) -> str:
+    """Hash a schema once, so approval keys don't rehash it per review."""
+    return hashlib.sha256(schema.encode()).hexdigest()
+
+
+def _approval_key(schema: str, question: str, raw_sql: str) -> str:
+    """Hash a review so formatting-only differences share one approval."""
+    sql = " ".join(raw_sql.split()).rstrip(";").strip()
+    question = " ".join(question.lower().split())
+    parts = (_schema_digest(schema), question, sql)
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
 class SQLReviewerAgent:
     """Agent that reviews SQL queries and provides feedback."""
 
@@ -33,14 +65,28 @@ class SQLReviewerAgent:
         self,
         model: str | None = None,
         on_activity: AgentCallback | None = None,
+        client: AsyncOpenAI | None = None,
     ):
-        """Initialize the SQL reviewer agent."""
-        self.client = AsyncOpenAI()
+        """Initialize the SQL reviewer agent, on the shared client by default."""
+        self._client = client
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-5-mini")
         self.on_activity = on_activity
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared OpenAI client, resolved on first use."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
     async def review(
-        self, question: str, schema: str, raw_sql: str, sql_result: str
+        self,
+        question: str,
+        schema: str,
+        raw_sql: str,
+        sql_result: str,
+        attempt: int = 0,
+        on_activity: AgentCallback | None = None,
     ) -> str | None:
         """
         Review a SQL query and its results.
@@ -50,18 +96,30 @@ class SQLReviewerAgent:
             schema: The database schema
             raw_sql: The generated SQL query
             sql_result: The results from executing the query
+            attempt: Zero-based attempt number. Early attempts are reviewed
+                     with the lowest effort the model accepts; later ones
+                     escalate.
+            on_activity: Activity callback for this call, overriding the
+                         agent's own, so one agent can serve every request
 
         Returns:
             Feedback string if the query is incorrect, None if correct
         """
         # Notify about agent activity
-        if self.on_activity:
-            self.on_activity(
+        on_activity = on_activity or self.on_activity
+        if on_activity:
+            on_activity(
                 "SQLReviewerAgent",
                 "reviewing",
                 {"sql": raw_sql},
             )
 
+        # Skip the LLM for a query already approved for this question
+        key = _approval_key(schema, question, raw_sql)
+        if key in _approved:
+            _approved.move_to_end(key)
+            return None
+
         review_prompt = f"""Original Question: {question}
 
         Generated SQL Query:
@@ -77,15 +135,24 @@ class SQLReviewerAgent:
 
         response = await self.client.responses.create(
             model=self.model,
-            instructions=INSTRUCTIONS.format(schema=schema),
+            instructions=schema_instructions(INSTRUCTIONS, schema),
             input=input_messages,
-            reasoning={"effort": "medium"},
+            reasoning={"effort": self._effort(attempt)},
         )
 
         result = response.output_text.strip()
 
         # If the reviewer says CORRECT, return None (no feedback needed)
         if result.upper() == "CORRECT":
+            _approved[key] = None
+            if len(_approved) > MAX_APPROVED_QUERIES:
+                _approved.popitem(last=False)
             return None
 
         return result
+
+    def _effort(self, attempt: int) -> ReasoningEffort:
+        """Reasoning effort for a review attempt; most reviews just say CORRECT."""
+        if attempt < ESCALATE_AFTER_ATTEMPTS:
+            return lowest_effort(self.model)
+        return "medium"
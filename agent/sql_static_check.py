@@ -0,0 +1,97 @@
+"""Static SQL checks that catch mechanical errors without an LLM call."""
+
+import re
+import sqlite3
+from functools import lru_cache
+
+
+_MISSING_RE = re.compile(r"no such (table|column): (\S+)")
+
+
+@lru_cache(maxsize=8)
+def _schema_connection(schema: str) -> sqlite3.Connection | None:
+    """
+    Build an empty in-memory database from a schema, memoized per schema.
+
+    Returns None if the schema is not valid SQLite DDL, in which case
+    queries can't be checked against it.
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        conn.executescript(schema)
+    except sqlite3.Error:
+        conn.close()
+        return None
+    return conn
+
+
+@lru_cache(maxsize=8)
+def _schema_columns(schema: str) -> dict[str, list[str]]:
+    """Map each table in the schema to its column names."""
+    conn = _schema_connection(schema)
+    if conn is None:
+        return {}
+
+    tables = [
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+    ]
+    return {
+        table: [row[1] for row in conn.execute(f"PRAGMA table_info('{table}')")]
+        for table in tables
+    }
+
+
+def _describe_tables(columns: dict[str, list[str]]) -> str:
+    """Describe every table and its columns on one line each."""
+    return "\n".join(
+        f"- {table}: {', '.join(names)}" for table, names in columns.items()
+    )
+
+
+def check_sql(raw_sql: str, schema: str) -> str | None:
+    """
+    Check that a query compiles against the schema.
+
+    The query is prepared with EXPLAIN on an empty in-memory copy of the
+    schema, so unknown tables or columns, syntax errors and multiple
+    statements are caught in microseconds, without touching the real
+    database or asking the reviewer.
+
+    Args:
+        raw_sql: The generated SQL query
+        schema: The database schema
+
+    Returns:
+        Feedback string if the query is invalid, None if it compiles
+    """
+    conn = _schema_connection(schema)
+    if conn is None:
+        return None
+
+    try:
+        conn.execute(f"EXPLAIN {raw_sql}")
+    except (sqlite3.Error, sqlite3.Warning) as e:
+        message = str(e).rstrip(".")
+    else:
+        return None
+
+    feedback = f"The query does not compile: {message}."
+    columns = _schema_columns(schema)
+    match = _MISSING_RE.match(message)
+
+    if match and match.group(1) == "column":
+        table = match.group(2).partition(".")[0]
+        if table in columns:
+            return (
+                f"{feedback} Available columns on {table}: "
+                f"{', '.join(columns[table])}."
+            )
+
+    if match:
+        return f"{feedback} Available tables and columns:\n{_describe_tables(columns)}"
+
+    return feedback
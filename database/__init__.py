@@ -1,6 +1,21 @@
-from .connection import get_connection, execute_query
+from .connection import (
+    get_connection,
+    execute_query,
+    aexecute_query,
+    is_select_query,
+    sql_batch,
+)
 from .models import init_database
-from .seed import seed_database
+from .seed import bootstrap_database, seed_database
 
-__all__ = ["get_connection", "execute_query", "init_database", "seed_database"]
+__all__ = [
+    "get_connection",
+    "execute_query",
+    "aexecute_query",
+    "is_select_query",
+    "sql_batch",
+    "init_database",
+    "seed_database",
+    "bootstrap_database",
+]
 
@@ -1,12 +1,49 @@
+import asyncio
 import sqlite3
 import os
-from contextlib import contextmanager
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar, copy_context
 from pathlib import Path
 
 
+DEFAULT_DB_PATH = "data/support.db"
+
+# Pragmas applied once to each long-lived read connection
+READ_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",  # 8 MB page cache per connection
+    "PRAGMA mmap_size=268435456",
+    # SQLite accepts writes after a CTE (WITH ... DELETE), so enforce read-only
+    "PRAGMA query_only=ON",
+)
+
+# Statements allowed by execute_query: plain SELECTs and CTEs, optionally
+# preceded by whitespace and /* block */ or -- line comments. Possessive and
+# atomic groups stop a comment from ending early or late, which could let a
+# keyword inside the comment pass the check, and keep matching linear.
+_SELECT_RE = re.compile(
+    r"(?:\s|/\*(?>.*?\*/)|--[^\n]*+)*+(?:SELECT|WITH)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Per-thread read connection reused across queries
+_tls = threading.local()
+
+# Dedicated threads for sqlite work, each holding its own read connection
+_DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SQLITE_WORKERS", "4")),
+    thread_name_prefix="sqlite",
+)
+
+
 def get_db_path() -> Path:
     """Get the database path from environment or use default."""
-    db_path = os.getenv("DATABASE_PATH", "data/support.db")
+    db_path = os.getenv("DATABASE_PATH", DEFAULT_DB_PATH)
     path = Path(db_path)
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
@@ -29,19 +66,177 @@ def get_connection():
         conn.close()
 
 
+def get_read_connection() -> sqlite3.Connection:
+    """
+    Get this thread's long-lived read connection.
+
+    The connection is opened lazily with WAL mode and read-friendly pragmas,
+    then reused by every query on the thread, so queries skip the connect,
+    journal setup and statement-cache warmup cost. It is reopened if
+    DATABASE_PATH changes. Rows are plain tuples, since execute_query zips
+    them with the column names itself.
+    """
+    db_path = os.getenv("DATABASE_PATH", DEFAULT_DB_PATH)
+    conn: sqlite3.Connection | None = getattr(_tls, "conn", None)
+
+    if conn is None or _tls.db_path != db_path:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(get_db_path(), check_same_thread=False)
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        _tls.conn = conn
+        _tls.db_path = db_path
+
+    return conn
+
+
+class SqlBatch:
+    """
+    Shared connection and transaction for the queries of one tool round.
+
+    The connection is opened and a transaction begun on the first query, so
+    every query in the round reads the same snapshot and the journal is set
+    up once. Queries may arrive from several worker threads and are
+    serialized on a lock. Once closed, the batch rejects further queries.
+    """
+
+    def __init__(self):
+        self._conn: sqlite3.Connection | None = None
+        self._closed = False
+        self._lock = threading.Lock()
+        # Queries submitted to the sqlite executor and not yet finished
+        self._pending: set[Future] = set()
+
+    def execute(self, query: str) -> tuple[list[tuple], tuple]:
+        """Execute a query inside the batch transaction and fetch its rows."""
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("SQL batch is closed")
+            if self._conn is None:
+                self._conn = sqlite3.connect(get_db_path(), check_same_thread=False)
+                for pragma in READ_PRAGMAS:
+                    self._conn.execute(pragma)
+                self._conn.execute("BEGIN")
+            cursor = self._conn.execute(query)
+            # Fetch under the lock so another thread can't reset the cursor
+            return cursor.fetchall(), cursor.description
+
+    def track(self, future: Future) -> None:
+        """Remember a query running on the sqlite executor until it finishes."""
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    async def drain(self) -> None:
+        """
+        Stop and wait for queries still on the sqlite executor.
+
+        Their callers are gone by the time the batch ends, as when a round
+        times out, but the worker threads keep running and must not touch
+        the connection while it is closed. Queued queries are cancelled and
+        a running one is interrupted.
+        """
+        pending = tuple(self._pending)
+        if not pending:
+            return
+        for future in pending:
+            future.cancel()
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+        await asyncio.wait([asyncio.wrap_future(future) for future in pending])
+
+    def close(self, commit: bool = True) -> None:
+        """End the transaction and close the connection if one was opened."""
+        with self._lock:
+            self._closed = True
+            if self._conn is None:
+                return
+            try:
+                if commit:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+            finally:
+                self._conn.close()
+                self._conn = None
+
+
+# Batch active for the current tool round, if any
+_current_batch: ContextVar[SqlBatch | None] = ContextVar("sql_batch", default=None)
+
+
+@asynccontextmanager
+async def sql_batch():
+    """
+    Run every execute_query call in this context in one shared transaction.
+
+    Tasks and worker threads started inside the block inherit the batch
+    through the context. The transaction is committed when the block exits
+    normally and rolled back otherwise, after queries left running by
+    cancelled tasks have stopped. A block nested in another joins the
+    outer batch, which stays open until the outer block exits.
+
+    Usage:
+        async with sql_batch():
+            await asyncio.gather(*tasks)
+    """
+    current = _current_batch.get()
+    if current is not None:
+        yield current
+        return
+
+    batch = SqlBatch()
+    token = _current_batch.set(batch)
+    commit = False
+    try:
+        yield batch
+        commit = True
+    finally:
+        _current_batch.reset(token)
+        try:
+            await batch.drain()
+        finally:
+            batch.close(commit=commit)
+
+
+def is_select_query(query: str) -> bool:
+    """Check that a query is a SELECT statement (including WITH CTEs)."""
+    # Matched on the prefix without building an uppercased copy of the query
+    return _SELECT_RE.match(query) is not None
+
+
 def execute_query(query: str) -> list[dict]:
     """
     Execute a read-only SQL query and return results as list of dicts.
 
-    Only SELECT statements are allowed for safety.
+    Only SELECT statements (including WITH CTEs) are allowed for safety.
+    Inside sql_batch() the query runs on the batch's shared connection.
     """
     # Basic safety check - only allow SELECT queries
-    normalized = query.strip().upper()
-    if not normalized.startswith("SELECT"):
+    if not is_select_query(query):
         raise ValueError("Only SELECT queries are allowed for safety reasons")
 
-    with get_connection() as conn:
-        cursor = conn.execute(query)
-        columns = [description[0] for description in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        return results
+    batch = _current_batch.get()
+    if batch is not None:
+        rows, description = batch.execute(query)
+    else:
+        cursor = get_read_connection().execute(query)
+        rows, description = cursor.fetchall(), cursor.description
+
+    columns = tuple(column[0] for column in description)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+async def aexecute_query(query: str) -> list[dict]:
+    """
+    Execute a read-only SQL query on the sqlite executor without blocking.
+
+    The caller's context is carried into the worker thread, so queries
+    inside sql_batch() still use the batch connection.
+    """
+    future = _DB_EXECUTOR.submit(copy_context().run, execute_query, query)
+    batch = _current_batch.get()
+    if batch is not None:
+        batch.track(future)
+    return await asyncio.wrap_future(future)
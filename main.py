@@ -6,16 +6,14 @@ import os
 import sys
 
 from dotenv import load_dotenv
-from rich.markdown import Markdown
 from rich.prompt import Prompt
 
-from agent import SupportAgent
 from utils import (
     console,
     print_welcome,
     show_tool_call,
     show_agent_activity,
-    initialize,
+    initialize_async,
 )
 
 
@@ -32,15 +30,25 @@ async def main():
         )
         sys.exit(1)
 
+    # Heavy imports (openai, chromadb) are deferred until the key check passes
+    from agent import SupportAgent
+    from agent.openai_client import close_client
+    from agent.semantic_cache import get_semantic_cache
+
     try:
-        initialize()
+        await initialize_async()
     except Exception as e:
         console.print(f"[red]Initialization error:[/red] {e}")
         sys.exit(1)
 
+    semantic_cache = get_semantic_cache()
+    # Without callbacks, tool activity isn't formatted or printed at all
+    show_activity = os.getenv("SHOW_TOOL_ACTIVITY", "true").lower() != "false"
     agent = SupportAgent(
-        on_tool_call=show_tool_call,
-        on_agent_activity=show_agent_activity,
+        on_tool_call=show_tool_call if show_activity else None,
+        on_agent_activity=show_agent_activity if show_activity else None,
+        semantic_cache=semantic_cache,
+        stream=True,
     )
 
     print_welcome()
@@ -64,11 +72,18 @@ async def main():
                 continue
 
             console.print("[cyan]Thinking...[/cyan]")
-            response = await agent.chat(user_input)
 
+            from rich.live import Live
+            from rich.markdown import Markdown
+
+            # Render the answer as it streams in
             console.print()
             console.print("[bold blue]Agent[/bold blue]")
-            console.print(Markdown(response))
+            chunks: list[str] = []
+            with Live(Markdown(""), console=console, refresh_per_second=15) as live:
+                async for delta in agent.chat_stream(user_input):
+                    chunks.append(delta)
+                    live.update(Markdown("".join(chunks)))
             console.print()
 
         except KeyboardInterrupt:
@@ -77,6 +92,11 @@ async def main():
         except Exception as e:
             console.print(f"\n[red]Error:[/red] {e}\n")
 
+    if semantic_cache:
+        semantic_cache.save()
+
+    await close_client()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
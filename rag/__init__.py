@@ -1,5 +1,14 @@
-from .vectorstore import PolicyStore
-from .loader import load_policies
-
-__all__ = ["PolicyStore", "load_policies"]
+def __getattr__(name: str):
+    """Lazy import so chromadb loads only when the vector store is used."""
+    if name == "PolicyStore":
+        from .vectorstore import PolicyStore
+        return PolicyStore
+    if name == "get_policy_store":
+        from .vectorstore import get_policy_store
+        return get_policy_store
+    if name == "load_policies":
+        from .loader import load_policies
+        return load_policies
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+__all__ = ["PolicyStore", "get_policy_store", "load_policies"]
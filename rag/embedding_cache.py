@@ -0,0 +1,99 @@
+"""Disk-backed cache of chunk embeddings keyed by content hash."""
+
+import hashlib
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+from chromadb.base_types import PyVector
+
+from .embeddings import EMBEDDING_MODEL
+
+
+MAX_KEYS_PER_QUERY = 500
+
+# Vectors are stored at half precision, which halves the cache size and has
+# no meaningful effect on cosine distances between normalized embeddings
+VECTOR_DTYPE = np.float16
+
+
+def _content_hash(text: str) -> bytes:
+    """Hash chunk content into a compact cache key."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def quantize(embedding: PyVector) -> PyVector:
+    """Round an embedding to the precision it is cached at."""
+    return np.asarray(embedding, dtype=VECTOR_DTYPE).astype(np.float32).tolist()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embeddings for previously embedded chunks.
+
+    Entries are keyed by a BLAKE2b hash of the chunk content and the
+    embedding model, so re-indexing unchanged policies needs no API calls.
+    """
+
+    def __init__(self, path: str | Path, model: str = EMBEDDING_MODEL):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path: SQLite file holding the cache, created if missing
+            model: Embedding model the cached vectors belong to
+        """
+        self.path = Path(path)
+        self.model = model
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(sqlite3.connect(self.path)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings_f16 ("
+                "hash BLOB NOT NULL, model TEXT NOT NULL, vec BLOB NOT NULL, "
+                "PRIMARY KEY (hash, model))"
+            )
+            conn.commit()
+
+    def get_many(self, texts: list[str]) -> list[PyVector | None]:
+        """Return the cached embedding for each text, or None for misses."""
+        keys = [_content_hash(text) for text in texts]
+        rows: dict[bytes, bytes] = {}
+
+        with closing(sqlite3.connect(self.path)) as conn:
+            # Stay well under SQLite's limit on bound parameters
+            for i in range(0, len(keys), MAX_KEYS_PER_QUERY):
+                batch = keys[i : i + MAX_KEYS_PER_QUERY]
+                placeholders = ", ".join("?" * len(batch))
+                rows.update(
+                    conn.execute(
+                        "SELECT hash, vec FROM embeddings_f16 "
+                        f"WHERE model = ? AND hash IN ({placeholders})",
+                        [self.model, *batch],
+                    )
+                )
+
+        return [
+            np.frombuffer(rows[key], dtype=VECTOR_DTYPE).astype(np.float32).tolist()
+            if key in rows
+            else None
+            for key in keys
+        ]
+
+    def put_many(self, texts: list[str], embeddings: list[PyVector]) -> None:
+        """Store embeddings for the given texts."""
+        with closing(sqlite3.connect(self.path)) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings_f16 (hash, model, vec) "
+                "VALUES (?, ?, ?)",
+                [
+                    (
+                        _content_hash(text),
+                        self.model,
+                        np.asarray(embedding, dtype=VECTOR_DTYPE).tobytes(),
+                    )
+                    for text, embedding in zip(texts, embeddings)
+                ],
+            )
+            conn.commit()
@@ -1,30 +1,145 @@
 """OpenAI embeddings wrapper."""
 
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from openai import OpenAI
 from chromadb.base_types import PyVector
 
 
 EMBEDDING_MODEL = "text-embedding-3-small"
+MAX_CACHED_EMBEDDINGS = 1024
+
+# Per-request limits of the embeddings API, with headroom on tokens
+MAX_BATCH_TOKENS = 250_000
+MAX_BATCH_ITEMS = 2048
+MAX_CONCURRENT_BATCHES = 4
+
+# Fail fast on a stalled request rather than hang the chat turn
+REQUEST_TIMEOUT_SECONDS = 30.0
+MAX_RETRIES = 2
+
+# Global client instance (initialized lazily)
+_client: OpenAI | None = None
+
+# Recent embeddings keyed by normalized text, in LRU order
+_cache: OrderedDict[str, tuple[float, ...]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get_client() -> OpenAI:
+    """Get the shared OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = OpenAI(timeout=REQUEST_TIMEOUT_SECONDS, max_retries=MAX_RETRIES)
+    return _client
+
+
+def _reset_client() -> None:
+    """Drop the shared client and cached embeddings (used by tests)."""
+    global _client
+    _client = None
+    with _cache_lock:
+        _cache.clear()
+
+
+def _normalize(text: str) -> str:
+    """Normalize text so trivial formatting differences share a cache entry."""
+    return " ".join(text.lower().split())
 
 
 def get_embeddings(texts: list[str]) -> list[PyVector]:
     """
     Get embeddings for a list of texts using OpenAI's embedding API.
 
+    Recently embedded texts are served from an in-memory LRU cache, and only
+    the remaining unique texts are sent to the API in a single request.
+
     Args:
         texts: List of text strings to embed
 
     Returns:
         List of embedding vectors compatible with ChromaDB
     """
-    client = OpenAI()
-    response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    keys = [_normalize(text) for text in texts]
+    found: dict[str, tuple[float, ...]] = {}
+    misses: dict[str, str] = {}
 
-    # Sort by index - order is not guaranteed by the API
-    sorted_data = sorted(response.data, key=lambda x: x.index)
-    return [item.embedding for item in sorted_data]
+    with _cache_lock:
+        for key, text in zip(keys, texts):
+            if key in _cache:
+                _cache.move_to_end(key)
+                found[key] = _cache[key]
+            elif key not in misses:
+                misses[key] = text
+
+    if misses:
+        response = _get_client().embeddings.create(
+            model=EMBEDDING_MODEL, input=list(misses.values())
+        )
+
+        # Sort by index - order is not guaranteed by the API
+        sorted_data = sorted(response.data, key=lambda x: x.index)
+        with _cache_lock:
+            for key, item in zip(misses, sorted_data):
+                found[key] = _cache[key] = tuple(item.embedding)
+            while len(_cache) > MAX_CACHED_EMBEDDINGS:
+                _cache.popitem(last=False)
+
+    return [list(found[key]) for key in keys]
 
 
 def get_embedding(text: str) -> PyVector:
     """Get embedding for a single text."""
     return get_embeddings([text])[0]
+
+
+def _estimate_tokens(text: str) -> int:
+    """Estimate tokens conservatively (about three bytes each)."""
+    return len(text.encode()) // 3 + 1
+
+
+def _batch_by_tokens(texts: list[str]) -> list[list[str]]:
+    """Split texts into consecutive batches within the API request limits."""
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    batch_tokens = 0
+
+    for text in texts:
+        tokens = _estimate_tokens(text)
+        if batch and (
+            batch_tokens + tokens > MAX_BATCH_TOKENS or len(batch) >= MAX_BATCH_ITEMS
+        ):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def get_embeddings_batched(texts: list[str]) -> list[PyVector]:
+    """
+    Get embeddings for any number of texts, in request-sized batches.
+
+    Texts are split into batches that fit the API's per-request token and
+    item limits, and the batches are embedded concurrently.
+
+    Args:
+        texts: List of text strings to embed
+
+    Returns:
+        List of embedding vectors in input order
+    """
+    batches = _batch_by_tokens(texts)
+    if len(batches) <= 1:
+        return get_embeddings(texts) if texts else []
+
+    with ThreadPoolExecutor(
+        max_workers=min(MAX_CONCURRENT_BATCHES, len(batches))
+    ) as executor:
+        results = executor.map(get_embeddings, batches)
+        return [embedding for batch in results for embedding in batch]
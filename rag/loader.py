@@ -1,10 +1,40 @@
-from pathlib import Path
+import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
 
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
+MAX_LOAD_WORKERS = 32
+
+# Chunks target a size in embedding tokens, estimated at about four
+# characters per token for English text
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 400
+OVERLAP_TOKENS = 40
+
+# Two-character break markers; lookaheads also match overlapping runs
+_PARAGRAPH_BREAK_RE = re.compile(r"(?=\n\n)")
+_SENTENCE_BREAK_RE = re.compile(r"(?=\. )")
+_TITLE_RE = re.compile(r"^# (.*)$", re.MULTILINE)
+
+
+def _last_break_before(breaks: list[int], end: int) -> int:
+    """Return the last two-character break ending by end, or -1 if none."""
+    i = bisect_right(breaks, end - 2) - 1
+    return breaks[i] if i >= 0 else -1
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = CHUNK_TOKENS * CHARS_PER_TOKEN,
+    overlap: int = OVERLAP_TOKENS * CHARS_PER_TOKEN,
+) -> list[str]:
     """
     Split text into overlapping chunks.
     
+    The defaults give chunks of about 400 tokens with 40 tokens of overlap.
+    
     Args:
         text: The text to split
         chunk_size: Maximum characters per chunk
@@ -16,6 +46,11 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]
     if len(text) <= chunk_size:
         return [text]
     
+    # Find every paragraph and sentence break once, then bisect per chunk
+    # instead of scanning backwards from each chunk end
+    paragraph_breaks = [m.start() for m in _PARAGRAPH_BREAK_RE.finditer(text)]
+    sentence_breaks = [m.start() for m in _SENTENCE_BREAK_RE.finditer(text)]
+    
     chunks = []
     start = 0
     
@@ -25,12 +60,12 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]
         # Try to break at a paragraph or sentence boundary
         if end < len(text):
             # Look for paragraph break
-            newline_pos = text.rfind("\n\n", start, end)
+            newline_pos = _last_break_before(paragraph_breaks, end)
             if newline_pos > start + chunk_size // 2:
                 end = newline_pos
             else:
                 # Look for sentence break
-                period_pos = text.rfind(". ", start, end)
+                period_pos = _last_break_before(sentence_breaks, end)
                 if period_pos > start + chunk_size // 2:
                     end = period_pos + 1
         
@@ -43,40 +78,58 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]
     return chunks
 
 
+def _load_policy_file(file_path: str) -> list[dict]:
+    """Read and chunk one policy file into document dicts."""
+    # Text mode, so CRLF files split on paragraph breaks like LF files
+    with open(file_path, encoding="utf-8") as f:
+        content = f.read()
+    
+    # Extract title from first heading, usually the first line
+    if content.startswith("# "):
+        title = content[2:].partition("\n")[0].strip()
+    elif match := _TITLE_RE.search(content):
+        title = match.group(1).strip()
+    else:
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        title = stem.replace("_", " ").title()
+    
+    # Chunk the content
+    chunks = chunk_text(content)
+    
+    return [
+        {
+            "content": chunk,
+            "source": file_path,
+            "title": title,
+            "chunk_index": i,
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+
+
 def load_policies(policies_dir: str = "policies") -> list[dict]:
     """
     Load all policy documents from the policies directory.
     
+    Files are read and chunked in parallel threads.
+    
     Returns:
         List of dicts with 'content', 'source', and 'title' keys
     """
-    policies_path = Path(policies_dir)
-    documents = []
+    if not os.path.isdir(policies_dir):
+        return []
     
-    if not policies_path.exists():
-        return documents
+    # scandir yields names with cached file types, avoiding a Path and a
+    # stat() call per directory entry
+    with os.scandir(policies_dir) as entries:
+        paths = [
+            entry.path
+            for entry in entries
+            if entry.name.endswith(".md") and entry.is_file()
+        ]
+    if not paths:
+        return []
     
-    for file_path in policies_path.glob("*.md"):
-        content = file_path.read_text()
-        
-        # Extract title from first heading
-        lines = content.split("\n")
-        title = file_path.stem.replace("_", " ").title()
-        for line in lines:
-            if line.startswith("# "):
-                title = line[2:].strip()
-                break
-        
-        # Chunk the content
-        chunks = chunk_text(content)
-        
-        for i, chunk in enumerate(chunks):
-            documents.append({
-                "content": chunk,
-                "source": str(file_path),
-                "title": title,
-                "chunk_index": i,
-            })
-    
-    return documents
-
+    with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(paths))) as executor:
+        per_file = executor.map(_load_policy_file, paths)
+        return list(chain.from_iterable(per_file))
@@ -1,15 +1,114 @@
 from chromadb import QueryResult
+import itertools
+import logging
 import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from typing import TypedDict
 
 import chromadb
+import numpy as np
+from chromadb import Collection, Documents, EmbeddingFunction, Embeddings
+from chromadb.api import ClientAPI
+from chromadb.base_types import PyVector
 from chromadb.config import Settings
+from chromadb.utils.embedding_functions import register_embedding_function
 
-from .embeddings import get_embeddings, get_embedding
+from .embedding_cache import EmbeddingCache, quantize
+from .embeddings import EMBEDDING_MODEL, get_embeddings_batched
 from .loader import load_policies
 
 
+MAX_CACHED_SEARCHES = 256
+MAX_OPEN_STORES = 8
+
+# Part of the ValueError ChromaDB raises when a collection is opened with an
+# embedding function other than the one persisted with it
+_EMBEDDING_CONFLICT = "Embedding function conflict"
+
+logger = logging.getLogger(__name__)
+
+# Source of store content versions, unique across every store in the process
+_versions = itertools.count()
+
+# ChromaDB clients keyed by absolute persist directory
+_clients: dict[str, ClientAPI] = {}
+_clients_lock = threading.Lock()
+
+
+def _default_persist_dir() -> str:
+    """Resolve the ChromaDB directory from the CHROMA_PATH env var."""
+    return os.getenv("CHROMA_PATH", "data/chroma")
+
+
+def _get_client(persist_dir: str) -> ClientAPI:
+    """
+    Get the ChromaDB client for a directory, creating it on first use.
+
+    Creating a client validates its tenant and database on every call, even
+    though ChromaDB shares the underlying system per path, so stores
+    reopened on the same directory reuse one client.
+    """
+    key = os.path.abspath(persist_dir)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = chromadb.PersistentClient(
+                path=persist_dir, settings=Settings(anonymized_telemetry=False)
+            )
+    return client
+
+
+def _normalize_rows(vectors: list[PyVector]) -> list[PyVector]:
+    """Scale vectors to unit length so inner product equals cosine similarity."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    arr /= np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
+    return arr.tolist()
+
+
+@register_embedding_function
+class PolicyEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Chroma embedding function for policy chunks and search queries.
+
+    Texts are embedded in request-sized batches and normalized to unit
+    length, so documents and queries are embedded the same way.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        """
+        Initialize the embedding function.
+
+        Args:
+            model: Embedding model the collection's vectors come from
+        """
+        self.model = model
+
+    def __call__(self, input: Documents) -> Embeddings:
+        """Embed texts as unit-length vectors."""
+        return _normalize_rows(get_embeddings_batched(list(input)))
+
+    @staticmethod
+    def name() -> str:
+        """Name the embedding function is registered under."""
+        return "customer_support_openai"
+
+    @staticmethod
+    def build_from_config(config: dict) -> "PolicyEmbeddingFunction":
+        """Rebuild the embedding function from a persisted collection config."""
+        return PolicyEmbeddingFunction(model=config["model"])
+
+    def get_config(self) -> dict:
+        """Config persisted with the collection."""
+        return {"model": self.model}
+
+    def default_space(self) -> str:
+        """Vectors are unit length, so inner product gives cosine distance."""
+        return "ip"
+
+
 class SearchResult(TypedDict):
     """Type definition for a search result."""
 
@@ -24,6 +123,14 @@ class PolicyStore:
 
     COLLECTION_NAME = "policies"
 
+    # Vectors are normalized on the way in, so inner product gives cosine
+    # distance without a norm computation per comparison
+    DISTANCE_SPACE = "ip"
+
+    # Candidates explored per HNSW query. ChromaDB's default of 100 is far
+    # more than top-3 searches over a few hundred policy chunks need.
+    SEARCH_EF = 32
+
     def __init__(self, persist_dir: str | None = None):
         """
         Initialize the policy store.
@@ -33,20 +140,79 @@ class PolicyStore:
                         Defaults to data/chroma or CHROMA_PATH env var.
         """
         if persist_dir is None:
-            persist_dir = os.getenv("CHROMA_PATH", "data/chroma")
+            persist_dir = _default_persist_dir()
 
         Path(persist_dir).mkdir(parents=True, exist_ok=True)
 
-        self.client = chromadb.PersistentClient(
-            path=persist_dir, settings=Settings(anonymized_telemetry=False)
+        self.client = _get_client(persist_dir)
+        self.embedding_function = PolicyEmbeddingFunction()
+        self.collection = self._open_collection()
+        self.embedding_cache = EmbeddingCache(Path(persist_dir) / "embcache.db")
+
+        # Results of recent searches keyed by normalized query and count,
+        # in LRU order
+        self._search_cache: OrderedDict[
+            tuple[str, int], tuple[SearchResult, ...]
+        ] = OrderedDict()
+        self._search_lock = threading.Lock()
+
+        # Changes whenever the collection does, so callers can key their
+        # own caches of search results on it
+        self.version = next(_versions)
+
+        # Set once the collection is known to hold documents, so later
+        # is_empty() checks skip the count
+        self._has_documents = False
+
+    def _open_collection(self) -> Collection:
+        """
+        Open the policies collection with our embedding function.
+
+        A collection persisted with another embedding function can't be
+        queried by text, and one with another distance space ranks results
+        wrongly, so either is dropped and policies are reloaded on startup.
+        Any other error is raised, leaving the index as it is.
+        """
+        try:
+            collection = self._get_or_create_collection()
+        except ValueError as e:
+            if _EMBEDDING_CONFLICT not in str(e):
+                raise
+            reason = str(e)
+        else:
+            hnsw = collection.configuration.get("hnsw") or {}
+            space = hnsw.get("space", self.DISTANCE_SPACE)
+            if space == self.DISTANCE_SPACE:
+                return collection
+            reason = f"distance space {space!r} instead of {self.DISTANCE_SPACE!r}"
+
+        logger.warning(
+            "Rebuilding collection %r: %s", self.COLLECTION_NAME, reason
         )
-        self.collection = self.client.get_or_create_collection(
-            name=self.COLLECTION_NAME, metadata={"hnsw:space": "cosine"}
+        self.client.delete_collection(self.COLLECTION_NAME)
+        return self._get_or_create_collection()
+
+    def _get_or_create_collection(self) -> Collection:
+        """Get or create the policies collection, tuned for search."""
+        collection = self.client.get_or_create_collection(
+            name=self.COLLECTION_NAME,
+            metadata={
+                "hnsw:space": self.DISTANCE_SPACE,
+                "hnsw:search_ef": self.SEARCH_EF,
+            },
+            embedding_function=self.embedding_function,
         )
+        # Metadata only configures new collections; retune existing ones
+        hnsw = collection.configuration.get("hnsw") or {}
+        if hnsw.get("ef_search", self.SEARCH_EF) != self.SEARCH_EF:
+            collection.modify(configuration={"hnsw": {"ef_search": self.SEARCH_EF}})
+        return collection
 
     def is_empty(self) -> bool:
         """Check if the collection is empty."""
-        return self.collection.count() == 0
+        if not self._has_documents:
+            self._has_documents = self.collection.count() > 0
+        return not self._has_documents
 
     def load_documents(self, policies_dir: str = "policies") -> int:
         """
@@ -75,16 +241,37 @@ class PolicyStore:
             for doc in documents
         ]
 
-        # Get embeddings
-        embeddings = get_embeddings(contents)
+        # Reuse embeddings of unchanged chunks and embed each distinct
+        # remaining chunk once with the collection's embedding function
+        embeddings = self.embedding_cache.get_many(contents)
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            missing_contents = list(dict.fromkeys(contents[i] for i in misses))
+            # Quantize fresh vectors too, so they match their cached copies
+            new_embeddings = {
+                content: quantize(embedding)
+                for content, embedding in zip(
+                    missing_contents, self.embedding_function(missing_contents)
+                )
+            }
+            self.embedding_cache.put_many(
+                missing_contents, list(new_embeddings.values())
+            )
+            for i in misses:
+                embeddings[i] = new_embeddings[contents[i]]
 
-        # Add to collection
-        self.collection.upsert(
-            ids=ids,
-            embeddings=embeddings,
-            documents=contents,
-            metadatas=metadatas,
-        )
+        # Add to collection in as few calls as the client's batch limit allows
+        vectors = _normalize_rows(embeddings)
+        batch_size = self.client.get_max_batch_size()
+        for i in range(0, len(ids), batch_size):
+            self.collection.upsert(
+                ids=ids[i : i + batch_size],
+                embeddings=vectors[i : i + batch_size],
+                documents=contents[i : i + batch_size],
+                metadatas=metadatas[i : i + batch_size],
+            )
+        self._has_documents = True
+        self._clear_search_cache()
 
         return len(documents)
 
@@ -92,6 +279,9 @@ class PolicyStore:
         """
         Search for relevant policy documents.
 
+        Results of repeated searches are served from an LRU cache, which is
+        invalidated whenever the collection changes.
+
         Args:
             query: The search query
             n_results: Number of results to return
@@ -99,10 +289,55 @@ class PolicyStore:
         Returns:
             List of SearchResult with content, source, title, and distance
         """
-        query_embedding = get_embedding(query)
+        return self.search_many([query], n_results)[0]
+
+    def search_many(
+        self, queries: list[str], n_results: int = 3
+    ) -> list[list[SearchResult]]:
+        """
+        Search for several queries at once.
+
+        Cached queries are served from the LRU cache, and the remaining
+        distinct queries share one collection query, so they are embedded
+        in a single request.
+
+        Args:
+            queries: The search queries
+            n_results: Number of results to return per query
+
+        Returns:
+            List of SearchResult lists, one per query in input order
+        """
+        keys = [(query.strip().lower(), n_results) for query in queries]
+        found: dict[tuple[str, int], tuple[SearchResult, ...]] = {}
+        # Original text of the first query behind each uncached key
+        misses: dict[tuple[str, int], str] = {}
+
+        with self._search_lock:
+            for query, key in zip(queries, keys):
+                if key in self._search_cache:
+                    self._search_cache.move_to_end(key)
+                    found[key] = self._search_cache[key]
+                elif key not in found:
+                    misses.setdefault(key, query)
+
+        if misses:
+            results = self._query(list(misses.values()), n_results)
+            with self._search_lock:
+                for key, result in zip(misses, results):
+                    found[key] = self._search_cache[key] = result
+                while len(self._search_cache) > MAX_CACHED_SEARCHES:
+                    self._search_cache.popitem(last=False)
+
+        return [list(found[key]) for key in keys]
 
+    def _query(
+        self, queries: list[str], n_results: int
+    ) -> list[tuple[SearchResult, ...]]:
+        """Run one uncached collection query for the given queries."""
+        # Chroma embeds the queries with the collection's embedding function
         results: QueryResult = self.collection.query(
-            query_embeddings=[query_embedding],
+            query_texts=queries,
             n_results=n_results,
             include=["documents", "metadatas", "distances"],
         )
@@ -113,24 +348,55 @@ class PolicyStore:
             or not results["metadatas"]
             or not results["distances"]
         ):
-            return []
+            return [()] * len(queries)
 
-        documents: list[SearchResult] = []
-        for i in range(len(results["ids"][0])):
-            documents.append(
+        # Chroma already returns Python strs and floats; no coercion needed
+        return [
+            tuple(
                 SearchResult(
-                    content=str(results["documents"][0][i]),
-                    source=str(results["metadatas"][0][i]["source"]),
-                    title=str(results["metadatas"][0][i]["title"]),
-                    distance=float(results["distances"][0][i]),
+                    content=content,
+                    source=metadata["source"],
+                    title=metadata["title"],
+                    distance=distance,
                 )
+                for content, metadata, distance in zip(documents, metadatas, distances)
             )
-
-        return documents
+            for documents, metadatas, distances in zip(
+                results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
 
     def clear(self) -> None:
         """Clear all documents from the collection."""
-        self.client.delete_collection(self.COLLECTION_NAME)
-        self.collection = self.client.get_or_create_collection(
-            name=self.COLLECTION_NAME, metadata={"hnsw:space": "cosine"}
-        )
+        # Delete the records but keep the collection and its index handle
+        all_ids = self.collection.get(include=[])["ids"]
+        if all_ids:
+            self.collection.delete(ids=all_ids)
+        self._has_documents = False
+        self._clear_search_cache()
+
+    def _clear_search_cache(self) -> None:
+        """Drop cached search results after the collection changes."""
+        with self._search_lock:
+            self._search_cache.clear()
+            self.version = next(_versions)
+
+
+@lru_cache(maxsize=MAX_OPEN_STORES)
+def _open_policy_store(persist_dir: str) -> PolicyStore:
+    """Open a PolicyStore once per directory."""
+    return PolicyStore(persist_dir)
+
+
+def get_policy_store(persist_dir: str | None = None) -> PolicyStore:
+    """
+    Get the shared PolicyStore for a directory.
+
+    Opening a store starts a ChromaDB client and loads its index, so stores
+    are memoized per directory and reused by every caller.
+
+    Args:
+        persist_dir: Directory of the ChromaDB data.
+                    Defaults to data/chroma or CHROMA_PATH env var.
+    """
+    return _open_policy_store(persist_dir or _default_persist_dir())
@@ -3,15 +3,32 @@
 import os
 import sqlite3
 import tempfile
+from contextlib import closing
 from pathlib import Path
 from typing import Generator
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
 import pytest
 
 from database.models import init_database
 
 
+# ------------------------------------------------------------------
+# Module State Fixtures
+# ------------------------------------------------------------------
+
+
+@pytest.fixture(autouse=True)
+def clear_approved_queries():
+    """Start each test without SQL reviewer approvals from earlier tests."""
+    from agent.sql_reviewer import _clear_approved
+
+    _clear_approved()
+    yield
+    _clear_approved()
+
+
 # ------------------------------------------------------------------
 # Database Fixtures
 # ------------------------------------------------------------------
@@ -33,14 +50,28 @@ def initialized_db(temp_db_path: Path) -> Generator[Path, None, None]:
         yield temp_db_path
 
 
-@pytest.fixture
-def seeded_db(initialized_db: Path) -> Generator[Path, None, None]:
-    """Create a database with schema and seed data."""
-    from database.seed import seed_database
+@pytest.fixture(scope="session")
+def seeded_template(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Build a database with schema and seed data once per session."""
+    from database.seed import bootstrap_database
+
+    db_path = tmp_path_factory.mktemp("template") / "seeded.db"
+    with patch.dict(os.environ, {"DATABASE_PATH": str(db_path)}):
+        bootstrap_database()
+    return db_path
 
-    with patch.dict(os.environ, {"DATABASE_PATH": str(initialized_db)}):
-        seed_database()
-        yield initialized_db
+
+@pytest.fixture
+def seeded_db(
+    temp_db_path: Path, seeded_template: Path
+) -> Generator[Path, None, None]:
+    """Create a database with schema and seed data, copied from the template."""
+    # A page-level copy is much cheaper than replaying the schema and inserts
+    with closing(sqlite3.connect(seeded_template)) as source, closing(
+        sqlite3.connect(temp_db_path)
+    ) as target:
+        source.backup(target)
+    yield temp_db_path
 
 
 # ------------------------------------------------------------------
@@ -60,11 +91,47 @@ class MockResponseOutput:
 class MockResponse:
     """Mock for OpenAI Responses API response."""
 
-    def __init__(self, output_text: str = "", output: list | None = None):
+    def __init__(
+        self, output_text: str = "", output: list | None = None, id: str = "resp_1"
+    ):
+        self.id = id
         self.output_text = output_text
         self.output = output or [MockResponseOutput("message", content=output_text)]
 
 
+@pytest.fixture
+def fake_openai():
+    """Fake AsyncOpenAI client to inject into agents."""
+    client = MagicMock()
+    client.responses.create = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def async_returns():
+    """
+    Factory for a lightweight coroutine function returning values in turn.
+
+    Exceptions among the values are raised instead of returned. Cheaper than
+    AsyncMock(side_effect=[...]); the call count is kept in .call_count.
+    """
+
+    def factory(*values):
+        results = iter(values)
+
+        async def returns(*args, **kwargs):
+            returns.call_count += 1
+            value = next(results)
+            if isinstance(value, BaseException):
+                raise value
+            return value
+
+        returns.call_count = 0
+        return returns
+
+    return factory
+
+
 @pytest.fixture
 def mock_openai_client():
     """Mock AsyncOpenAI client for agent tests."""
@@ -97,16 +164,18 @@ def mock_openai_responses(mock_openai_client):
 def mock_embeddings():
     """Mock OpenAI embeddings API."""
 
+    # Shifts past 63 leave only the sign, as Python's >> does on an int64
+    shifts = np.minimum(np.arange(384), 63)
+
     def fake_embeddings(texts: list[str]) -> list[list[float]]:
         """Return deterministic fake embeddings based on text hash."""
-        embeddings = []
-        for text in texts:
-            # Create a simple deterministic embedding from text hash
-            hash_val = hash(text)
-            embedding = [(hash_val >> i) % 100 / 100.0 for i in range(384)]
-            embeddings.append(embedding)
-        return embeddings
+        # Create a simple deterministic embedding from each text hash
+        hashes = np.fromiter((hash(text) for text in texts), dtype=np.int64)
+        return ((hashes[:, None] >> shifts) % 100 / 100.0).tolist()
 
+    from rag.embeddings import _reset_client
+
+    _reset_client()
     with patch("rag.embeddings.OpenAI") as mock_openai:
         mock_client = MagicMock()
         mock_openai.return_value = mock_client
@@ -124,6 +193,7 @@ def mock_embeddings():
 
         mock_client.embeddings.create = create_embeddings
         yield mock_client
+    _reset_client()
 
 
 # ------------------------------------------------------------------
@@ -139,6 +209,10 @@ def temp_chroma_path(tmp_path: Path) -> Generator[Path, None, None]:
     with patch.dict(os.environ, {"CHROMA_PATH": str(chroma_path)}):
         yield chroma_path
 
+    from rag.vectorstore import _open_policy_store
+
+    _open_policy_store.cache_clear()
+
 
 # ------------------------------------------------------------------
 # Policy Files Fixtures
@@ -1,6 +1,7 @@
 """Tests for the main SupportAgent."""
 
 import asyncio
+from types import SimpleNamespace
 from typing import cast
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -8,6 +9,7 @@ import pytest
 
 from openai import APIConnectionError
 from openai.types.responses import EasyInputMessageParam
+from tenacity import wait_none
 
 
 class MockOutputItem:
@@ -22,326 +24,979 @@ class MockOutputItem:
 class MockResponse:
     """Mock for OpenAI Responses API response."""
 
-    def __init__(self, output_text: str = "", output: list | None = None):
+    def __init__(
+        self, output_text: str = "", output: list | None = None, id: str = "resp_1"
+    ):
+        self.id = id
         self.output_text = output_text
         self.output = output or [MockOutputItem("message", content=output_text)]
 
 
+class MockStream:
+    """Mock for a Responses API stream of text delta and output_item.done events."""
+
+    def __init__(self, response: MockResponse):
+        self.response = response
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for item in self.response.output:
+            if item.type == "message" and item.content:
+                for word in item.content.split(" "):
+                    yield MockOutputItem(
+                        "response.output_text.delta", delta=word + " "
+                    )
+            yield MockOutputItem("response.output_item.done", item=item)
+
+    async def get_final_response(self):
+        return self.response
+
+
 class TestSupportAgent:
     """Tests for SupportAgent class."""
 
-    @pytest.mark.asyncio
-    async def test_chat_returns_response(self):
+    async def test_chat_returns_response(self, fake_openai):
         """Should return agent response text."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_openai.return_value = mock_client
+        mock_response = MockResponse(output_text="Hello! How can I help you?")
+        fake_openai.responses.create = AsyncMock(return_value=mock_response)
 
-            mock_response = MockResponse(output_text="Hello! How can I help you?")
-            mock_client.responses.create = AsyncMock(return_value=mock_response)
+        from agent.core import SupportAgent
 
-            from agent.core import SupportAgent
-
-            agent = SupportAgent()
-            result = await agent.chat("Hello")
+        agent = SupportAgent(client=fake_openai)
+        result = await agent.chat("Hello")
 
-            assert result == "Hello! How can I help you?"
+        assert result == "Hello! How can I help you?"
 
-    @pytest.mark.asyncio
-    async def test_maintains_conversation_history(self):
+    async def test_maintains_conversation_history(self, fake_openai):
         """Should maintain conversation history across calls."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_openai.return_value = mock_client
+        mock_response = MockResponse(output_text="Response")
+        fake_openai.responses.create = AsyncMock(return_value=mock_response)
 
-            mock_response = MockResponse(output_text="Response")
-            mock_client.responses.create = AsyncMock(return_value=mock_response)
+        from agent.core import SupportAgent
 
-            from agent.core import SupportAgent
+        agent = SupportAgent(client=fake_openai)
+        await agent.chat("First message")
+        await agent.chat("Second message")
 
-            agent = SupportAgent()
-            await agent.chat("First message")
-            await agent.chat("Second message")
+        # Conversation should have 4 items: 2 user messages + 2 responses
+        assert len(agent.conversation) == 4
 
-            # Conversation should have 4 items: 2 user messages + 2 responses
-            assert len(agent.conversation) == 4
-
-    @pytest.mark.asyncio
-    async def test_clear_history(self):
+    async def test_clear_history(self, fake_openai):
         """Should clear conversation history."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_openai.return_value = mock_client
+        mock_response = MockResponse(output_text="Response")
+        fake_openai.responses.create = AsyncMock(return_value=mock_response)
 
-            mock_response = MockResponse(output_text="Response")
-            mock_client.responses.create = AsyncMock(return_value=mock_response)
+        from agent.core import SupportAgent
 
-            from agent.core import SupportAgent
+        agent = SupportAgent(client=fake_openai)
+        await agent.chat("Hello")
 
-            agent = SupportAgent()
-            await agent.chat("Hello")
+        agent.clear_history()
 
-            agent.clear_history()
+        assert len(agent.conversation) == 0
 
-            assert len(agent.conversation) == 0
-
-    @pytest.mark.asyncio
-    async def test_handles_function_calls(self):
+    async def test_handles_function_calls(self, async_returns):
         """Should handle function call responses."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            with patch("agent.core.handle_tool_call") as mock_handle:
-                mock_client = MagicMock()
-                mock_openai.return_value = mock_client
-
-                # First response has function call
-                function_call_output = MockOutputItem(
-                    "function_call",
-                    call_id="call_123",
-                    name="search_policies",
-                    arguments='{"question": "return policy"}',
-                )
-                first_response = MockResponse(
-                    output_text="", output=[function_call_output]
-                )
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            mock_client = SimpleNamespace(responses=SimpleNamespace())
+
+            # First response has function call
+            function_call_output = MockOutputItem(
+                "function_call",
+                call_id="call_123",
+                name="search_policies",
+                arguments='{"question": "return policy"}',
+            )
+            first_response = MockResponse(
+                output_text="", output=[function_call_output]
+            )
 
-                # Second response is final message
-                final_response = MockResponse(
-                    output_text="Based on the policy, you can return within 30 days."
-                )
+            # Second response is final message
+            final_response = MockResponse(
+                output_text="Based on the policy, you can return within 30 days."
+            )
 
-                mock_client.responses.create = AsyncMock(
-                    side_effect=[first_response, final_response]
-                )
-                mock_handle.return_value = "Return policy: 30 days"
+            mock_client.responses.create = async_returns(
+                first_response, final_response
+            )
+            mock_handle.return_value = "Return policy: 30 days"
 
-                from agent.core import SupportAgent
+            from agent.core import SupportAgent
 
-                agent = SupportAgent()
-                result = await agent.chat("What's the return policy?")
+            agent = SupportAgent(client=mock_client)
+            result = await agent.chat("What's the return policy?")
 
-                assert result == "Based on the policy, you can return within 30 days."
-                mock_handle.assert_called_once()
+            assert result == "Based on the policy, you can return within 30 days."
+            mock_handle.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_invokes_tool_callback(self):
+    async def test_invokes_tool_callback(self, async_returns):
         """Should invoke tool call callback when set."""
         callback_calls = []
 
         def mock_callback(name, args):
             callback_calls.append((name, args))
 
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            with patch("agent.core.handle_tool_call") as mock_handle:
-                mock_client = MagicMock()
-                mock_openai.return_value = mock_client
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            mock_client = SimpleNamespace(responses=SimpleNamespace())
 
-                function_call_output = MockOutputItem(
-                    "function_call",
-                    call_id="call_123",
-                    name="search_policies",
-                    arguments='{"question": "test"}',
-                )
-                first_response = MockResponse(
-                    output_text="", output=[function_call_output]
-                )
-                final_response = MockResponse(output_text="Done")
+            function_call_output = MockOutputItem(
+                "function_call",
+                call_id="call_123",
+                name="search_policies",
+                arguments='{"question": "test"}',
+            )
+            first_response = MockResponse(
+                output_text="", output=[function_call_output]
+            )
+            final_response = MockResponse(output_text="Done")
 
-                mock_client.responses.create = AsyncMock(
-                    side_effect=[first_response, final_response]
-                )
-                mock_handle.return_value = "result"
+            mock_client.responses.create = async_returns(
+                first_response, final_response
+            )
+            mock_handle.return_value = "result"
 
-                from agent.core import SupportAgent
+            from agent.core import SupportAgent
 
-                agent = SupportAgent(on_tool_call=mock_callback)
-                await agent.chat("Test")
+            agent = SupportAgent(client=mock_client, on_tool_call=mock_callback)
+            await agent.chat("Test")
 
-                assert len(callback_calls) == 1
-                assert callback_calls[0][0] == "search_policies"
-                assert callback_calls[0][1] == {"question": "test"}
+            assert len(callback_calls) == 1
+            assert callback_calls[0][0] == "search_policies"
+            assert callback_calls[0][1] == {"question": "test"}
 
-    @pytest.mark.asyncio
-    async def test_multiple_function_calls(self):
+    async def test_multiple_function_calls(self, async_returns):
         """Should handle multiple function calls in single response."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            with patch("agent.core.handle_tool_call") as mock_handle:
-                mock_client = MagicMock()
-                mock_openai.return_value = mock_client
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            mock_client = SimpleNamespace(responses=SimpleNamespace())
+
+            # Response with two function calls
+            call1 = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="search_policies",
+                arguments='{"question": "returns"}',
+            )
+            call2 = MockOutputItem(
+                "function_call",
+                call_id="call_2",
+                name="query_orders_database",
+                arguments='{"query": "SELECT 1"}',
+            )
+            first_response = MockResponse(output_text="", output=[call1, call2])
+            final_response = MockResponse(output_text="Here's the info")
+
+            mock_client.responses.create = async_returns(
+                first_response, final_response
+            )
+            events = []
+
+            async def slow_tool(name, args, on_activity):
+                events.append(("run", name))
+                await asyncio.sleep(0.1)
+                return f"{name} result"
+
+            mock_handle.side_effect = slow_tool
+
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(
+                client=mock_client,
+                on_tool_call=lambda name, args: events.append(("start", name)),
+            )
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            result = await agent.chat("Get order and policy info")
+            elapsed = loop.time() - started
+
+            assert result == "Here's the info"
+            assert mock_handle.call_count == 2
+            # Every call is announced before any of them runs
+            assert events == [
+                ("start", "search_policies"),
+                ("start", "query_orders_database"),
+                ("run", "search_policies"),
+                ("run", "query_orders_database"),
+            ]
+            # Both tools ran at once, not one after the other
+            assert elapsed < 0.18
+
+    async def test_malformed_arguments_return_error(self, fake_openai):
+        """Should report unparseable arguments as a tool error, unannounced."""
+        callback_calls = []
+
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            bad_call = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="search_policies",
+                arguments='{"question": ',
+            )
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="", output=[bad_call]),
+                    MockResponse(output_text="Sorry"),
+                ]
+            )
+
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(
+                client=fake_openai,
+                on_tool_call=lambda name, args: callback_calls.append(name),
+            )
+            result = await agent.chat("Test")
+
+            assert result == "Sorry"
+            assert callback_calls == []
+            mock_handle.assert_not_called()
+            output = fake_openai.responses.create.call_args.kwargs["input"][0]
+            assert "Error executing search_policies" in output["output"]
+
+    async def test_failing_tool_does_not_cancel_siblings(self, fake_openai):
+        """Should report a failing tool as output while siblings complete."""
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            call1 = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="unknown_tool",
+                arguments="{}",
+            )
+            call2 = MockOutputItem(
+                "function_call",
+                call_id="call_2",
+                name="search_policies",
+                arguments='{"question": "returns"}',
+            )
+            first_response = MockResponse(output_text="", output=[call1, call2])
+            final_response = MockResponse(output_text="Done")
+
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[first_response, final_response]
+            )
+            mock_handle.side_effect = [
+                ValueError("Unknown tool: unknown_tool"),
+                "policy result",
+            ]
+
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(client=fake_openai)
+            result = await agent.chat("Test")
+
+            assert result == "Done"
+            outputs = [
+                item["output"]
+                for item in agent.conversation
+                if isinstance(item, dict)
+                and item.get("type") == "function_call_output"
+            ]
+            assert "Unknown tool: unknown_tool" in outputs[0]
+            assert "policy result" in outputs[1]
+
+    async def test_batches_database_tools_in_one_transaction(self, fake_openai):
+        """Should run a round's database tools inside one sql_batch."""
+        batched = []
+
+        async def record_batch(name, arguments, on_agent_activity=None):
+            from database.connection import _current_batch
 
-                # Response with two function calls
-                call1 = MockOutputItem(
+            batched.append(_current_batch.get())
+            return "db result"
+
+        with patch("agent.core.handle_tool_call", side_effect=record_batch):
+            calls = [
+                MockOutputItem(
                     "function_call",
-                    call_id="call_1",
-                    name="search_policies",
-                    arguments='{"question": "returns"}',
+                    call_id=f"call_{i}",
+                    name="query_orders_database",
+                    arguments=f'{{"query": "question {i}"}}',
                 )
-                call2 = MockOutputItem(
+                for i in range(2)
+            ]
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="", output=calls),
+                    MockResponse(output_text="Done"),
+                ]
+            )
+
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(client=fake_openai)
+            await agent.chat("Compare two orders")
+
+            assert len(batched) == 2
+            assert batched[0] is not None
+            assert batched[0] is batched[1]
+
+    async def test_batches_database_tools_started_while_streaming(self, fake_openai):
+        """Should run tools started mid-stream inside the round's sql_batch."""
+        batched = []
+
+        async def record_batch(name, arguments, on_agent_activity=None):
+            from database.connection import _current_batch
+
+            batched.append(_current_batch.get())
+            return "db result"
+
+        with patch("agent.core.handle_tool_call", side_effect=record_batch):
+            calls = [
+                MockOutputItem(
                     "function_call",
-                    call_id="call_2",
+                    call_id=f"call_{i}",
                     name="query_orders_database",
-                    arguments='{"query": "SELECT 1"}',
+                    arguments=f'{{"query": "question {i}"}}',
                 )
-                first_response = MockResponse(output_text="", output=[call1, call2])
-                final_response = MockResponse(output_text="Here's the info")
+                for i in range(2)
+            ]
+            fake_openai.responses.stream = MagicMock(
+                side_effect=[
+                    MockStream(MockResponse(output_text="", output=calls)),
+                    MockStream(MockResponse(output_text="Done")),
+                ]
+            )
+
+            from agent.core import SupportAgent
 
-                mock_client.responses.create = AsyncMock(
-                    side_effect=[first_response, final_response]
+            agent = SupportAgent(client=fake_openai, stream=True)
+            await agent.chat("Compare two orders")
+
+            assert len(batched) == 2
+            assert batched[0] is not None
+            assert batched[0] is batched[1]
+
+    async def test_deduplicates_identical_calls(self, fake_openai):
+        """Should execute identical calls in a round once and share the result."""
+        callback_calls = []
+
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            calls = [
+                MockOutputItem(
+                    "function_call",
+                    call_id=f"call_{i}",
+                    name="search_policies",
+                    arguments='{"question": "returns"}',
                 )
-                mock_handle.side_effect = ["policy result", "db result"]
+                for i in range(2)
+            ]
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="", output=calls),
+                    MockResponse(output_text="Done"),
+                ]
+            )
+            mock_handle.return_value = "policy result"
 
-                from agent.core import SupportAgent
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(
+                client=fake_openai,
+                on_tool_call=lambda name, args: callback_calls.append(name)
+            )
+            await agent.chat("Return policy?")
+
+            mock_handle.assert_called_once()
+            assert callback_calls == ["search_policies"]
+            outputs = [
+                item
+                for item in agent.conversation
+                if isinstance(item, dict)
+                and item.get("type") == "function_call_output"
+            ]
+            assert [o["call_id"] for o in outputs] == ["call_0", "call_1"]
+            assert outputs[0]["output"] == outputs[1]["output"]
+
+    async def test_stream_starts_tools_before_response_completes(self, fake_openai):
+        """Should start tool calls while streaming and reuse their results."""
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            call = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="search_policies",
+                arguments='{"question": "returns"}',
+            )
+            first_response = MockResponse(output_text="", output=[call])
+            final_response = MockResponse(output_text="Done")
+            fake_openai.responses.stream = MagicMock(
+                side_effect=[MockStream(first_response), MockStream(final_response)]
+            )
+            mock_handle.return_value = "policy result"
 
-                agent = SupportAgent()
-                result = await agent.chat("Get order and policy info")
+            from agent.core import SupportAgent
 
-                assert result == "Here's the info"
-                assert mock_handle.call_count == 2
+            agent = SupportAgent(client=fake_openai, stream=True)
+            result = await agent.chat("Return policy?")
 
-    @pytest.mark.asyncio
-    async def test_uses_custom_model(self):
-        """Should use custom model when specified."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_openai.return_value = mock_client
+            assert result == "Done"
+            mock_handle.assert_called_once()
+            assert fake_openai.responses.stream.call_count == 2
+            assert agent.conversation[2]["output"] == '"policy result"'
+
+    async def test_chat_stream_yields_text_deltas(self, fake_openai):
+        """Should yield text deltas as they stream and record the answer."""
+        fake_openai.responses.stream = MagicMock(
+            return_value=MockStream(MockResponse(output_text="Hi there"))
+        )
 
-            mock_response = MockResponse(output_text="Response")
-            mock_client.responses.create = AsyncMock(return_value=mock_response)
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai)
+        deltas = [delta async for delta in agent.chat_stream("Hello")]
+
+        assert deltas == ["Hi ", "there "]
+        assert len(agent.conversation) == 2
+
+    async def test_chat_stream_yields_cached_answer_whole(self, fake_openai):
+        """Should yield an answer that was not streamed in one piece."""
+        semantic_cache = MagicMock()
+        semantic_cache.embed = AsyncMock(return_value=[1.0])
+        semantic_cache.get.return_value = "Cached answer"
+
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai, semantic_cache=semantic_cache)
+        deltas = [delta async for delta in agent.chat_stream("Hello")]
+
+        assert deltas == ["Cached answer"]
+
+    async def test_semantic_cache_only_for_opening_question(self, fake_openai):
+        """Should not serve or store follow-ups, whose answers use earlier turns."""
+        semantic_cache = MagicMock()
+        semantic_cache.embed = AsyncMock(return_value=[1.0])
+        semantic_cache.get.return_value = None
+        fake_openai.responses.create = AsyncMock(
+            side_effect=[
+                MockResponse(output_text="Order 7 shipped."),
+                MockResponse(output_text="It arrives Friday."),
+            ]
+        )
+
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai, semantic_cache=semantic_cache)
+        await agent.chat("Where is order 7?")
+        await agent.chat("When will it arrive?")
+
+        semantic_cache.embed.assert_awaited_once_with("Where is order 7?")
+        semantic_cache.get.assert_called_once()
+        semantic_cache.put.assert_called_once()
+        assert semantic_cache.put.call_args.args[2] == "Order 7 shipped."
+
+    async def test_chat_stream_does_not_retry_after_text(self, fake_openai):
+        """Should not replay text already yielded when the stream then fails."""
+
+        class FailingStream(MockStream):
+            async def __aiter__(self):
+                yield MockOutputItem("response.output_text.delta", delta="Hello ")
+                raise APIConnectionError(request=MagicMock())
+
+        fake_openai.responses.stream = MagicMock(
+            side_effect=[
+                FailingStream(MockResponse(output_text="Hello world")),
+                MockStream(MockResponse(output_text="Hello world")),
+            ]
+        )
+
+        from agent.core import SupportAgent
+
+        with patch.object(SupportAgent._stream_api.retry, "wait", wait_none()):
+            agent = SupportAgent(client=fake_openai)
+            deltas = []
+            with pytest.raises(Exception, match="stream interrupted"):
+                async for delta in agent.chat_stream("Hello"):
+                    deltas.append(delta)
+
+        assert deltas == ["Hello "]
+        assert fake_openai.responses.stream.call_count == 1
+
+    async def test_stream_retries_before_any_text(self, fake_openai):
+        """Should retry a stream that fails before passing on any text."""
+
+        class FailingStream(MockStream):
+            async def __aiter__(self):
+                raise APIConnectionError(request=MagicMock())
+                yield
+
+        fake_openai.responses.stream = MagicMock(
+            side_effect=[
+                FailingStream(MockResponse()),
+                MockStream(MockResponse(output_text="Hello world")),
+            ]
+        )
+
+        from agent.core import SupportAgent
+
+        with patch.object(SupportAgent._stream_api.retry, "wait", wait_none()):
+            agent = SupportAgent(client=fake_openai)
+            deltas = [delta async for delta in agent.chat_stream("Hello")]
+
+        assert deltas == ["Hello ", "world "]
+        assert fake_openai.responses.stream.call_count == 2
+
+    async def test_tool_round_chains_previous_response(self, fake_openai):
+        """Should send only tool outputs chained to the previous response."""
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            call = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="search_policies",
+                arguments='{"question": "returns"}',
+            )
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="", output=[call], id="resp_a"),
+                    MockResponse(output_text="Done", id="resp_b"),
+                ]
+            )
+            mock_handle.return_value = "policy result"
 
             from agent.core import SupportAgent
 
-            agent = SupportAgent(model="gpt-4")
-            await agent.chat("Hello")
+            agent = SupportAgent(client=fake_openai)
+            await agent.chat("Return policy?")
+
+            chained = fake_openai.responses.create.call_args_list[1].kwargs
+            assert chained["previous_response_id"] == "resp_a"
+            assert chained["input"] == [
+                {
+                    "type": "function_call_output",
+                    "call_id": "call_1",
+                    "output": '"policy result"',
+                }
+            ]
+            assert len(agent.conversation) == 4
 
-            call_kwargs = mock_client.responses.create.call_args.kwargs
-            assert call_kwargs["model"] == "gpt-4"
+    @pytest.mark.parametrize(
+        ("message", "history_len", "effort"),
+        [
+            ("Where is my order #42?", 1, "minimal"),
+            ("Is the laptop in stock?", 1, "minimal"),
+            ("What is your return policy?", 1, "low"),
+            ("Can I return order 42?", 1, "low"),
+            ("Which of my orders should I consolidate?", 1, "medium"),
+            ("Where is my order #42?", 30, "medium"),
+        ],
+    )
+    def test_pick_effort(self, message, history_len, effort):
+        """Should scale reasoning effort with question complexity."""
+        from agent.core import _pick_effort
+
+        assert _pick_effort(message, history_len, "gpt-5-mini") == effort
+
+    @pytest.mark.parametrize(
+        ("model", "effort"),
+        [
+            ("gpt-5", "minimal"),
+            ("gpt-5-nano-2025-08-07", "minimal"),
+            ("gpt-5.1", "low"),
+            ("o4-mini", "low"),
+        ],
+    )
+    def test_pick_effort_gates_minimal_on_model(self, model, effort):
+        """Should fall back to low effort for models that reject minimal."""
+        from agent.core import _pick_effort
+
+        assert _pick_effort("Where is my order #42?", 1, model) == effort
+
+    async def test_uses_picked_effort_for_whole_turn(self, fake_openai):
+        """Should send the picked effort on every request of a turn."""
+        with patch("agent.core.handle_tool_call", return_value="shipped"):
+            call = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="query_orders_database",
+                arguments='{"query": "status of order 42"}',
+            )
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="", output=[call]),
+                    MockResponse(output_text="Shipped"),
+                ]
+            )
 
-    def test_has_function_calls_true(self):
-        """_has_function_calls should return True when output has function calls."""
-        with patch("agent.core.AsyncOpenAI"):
             from agent.core import SupportAgent
 
-            agent = SupportAgent()
-            output = [MockOutputItem("function_call", call_id="1", name="test")]
+            agent = SupportAgent(client=fake_openai)
+            await agent.chat("Where is my order #42?")
 
-            assert agent._has_function_calls(output) is True
+            efforts = [
+                call.kwargs["reasoning"]["effort"]
+                for call in fake_openai.responses.create.call_args_list
+            ]
+            assert efforts == ["minimal", "minimal"]
+
+    async def test_serializes_each_tool_output_once(self, async_returns):
+        """Should serialize tool outputs at append time, not on every turn."""
+        import orjson
+
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            mock_client = SimpleNamespace(responses=SimpleNamespace())
+            mock_handle.return_value = "policy result"
+
+            call = MockOutputItem(
+                "function_call",
+                call_id="call_1",
+                name="search_policies",
+                arguments='{"question": "returns"}',
+            )
+            turns = 10
+            mock_client.responses.create = async_returns(
+                *[
+                    response
+                    for _ in range(turns)
+                    for response in (
+                        MockResponse(output=[call]),
+                        MockResponse(output_text="Done"),
+                    )
+                ]
+            )
 
-    def test_has_function_calls_false(self):
-        """_has_function_calls should return False when no function calls."""
-        with patch("agent.core.AsyncOpenAI"):
             from agent.core import SupportAgent
 
-            agent = SupportAgent()
-            output = [MockOutputItem("message", content="text")]
+            agent = SupportAgent(client=mock_client)
+            dumps_per_turn = []
+            with patch(
+                "agent.core.orjson.dumps", wraps=orjson.dumps
+            ) as mock_dumps:
+                for _ in range(turns):
+                    before = mock_dumps.call_count
+                    await agent.chat("Return policy?")
+                    dumps_per_turn.append(mock_dumps.call_count - before)
+
+            # Serialization work per turn doesn't grow with history
+            assert len(set(dumps_per_turn)) == 1
+            assert all(
+                isinstance(item["output"], str)
+                for item in agent.conversation
+                if isinstance(item, dict) and "output" in item
+            )
+
+    async def test_outputs_follow_call_order(self, fake_openai):
+        """Should emit outputs in the model's call order, not completion order."""
 
-            assert agent._has_function_calls(output) is False
+        async def slow_first(name, arguments, on_agent_activity=None):
+            await asyncio.sleep(0.02 if arguments["question"] == "first" else 0)
+            return arguments["question"]
+
+        with patch("agent.core.handle_tool_call", side_effect=slow_first):
+            calls = [
+                MockOutputItem(
+                    "function_call",
+                    call_id=f"call_{question}",
+                    name="search_policies",
+                    arguments=f'{{"question": "{question}"}}',
+                )
+                for question in ("first", "second", "first")
+            ]
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="", output=calls),
+                    MockResponse(output_text="Done"),
+                ]
+            )
 
-    def test_has_function_calls_mixed(self):
-        """_has_function_calls should return True with mixed output."""
-        with patch("agent.core.AsyncOpenAI"):
             from agent.core import SupportAgent
 
-            agent = SupportAgent()
-            output = [
-                MockOutputItem("message", content="text"),
-                MockOutputItem("function_call", call_id="1", name="test"),
+            agent = SupportAgent(client=fake_openai)
+            await agent.chat("Two questions")
+
+            chained = fake_openai.responses.create.call_args.kwargs["input"]
+            assert [(o["call_id"], o["output"]) for o in chained] == [
+                ("call_first", '"first"'),
+                ("call_second", '"second"'),
+                ("call_first", '"first"'),
             ]
 
-            assert agent._has_function_calls(output) is True
+    async def test_uses_custom_model(self, fake_openai):
+        """Should use custom model when specified."""
+        mock_response = MockResponse(output_text="Response")
+        fake_openai.responses.create = AsyncMock(return_value=mock_response)
+
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai, model="gpt-4")
+        await agent.chat("Hello")
 
-    def test_truncate_conversation_when_over_limit(self):
-        """Should truncate conversation when over MAX_CONVERSATION_ITEMS."""
-        with patch("agent.core.AsyncOpenAI"):
-            from agent.core import SupportAgent, MAX_CONVERSATION_ITEMS
+        call_kwargs = fake_openai.responses.create.call_args.kwargs
+        assert call_kwargs["model"] == "gpt-4"
 
-            agent = SupportAgent()
-            # Add more items than the limit
-            for i in range(MAX_CONVERSATION_ITEMS + 10):
+    async def test_system_message_prefixes_input(self, fake_openai):
+        """Should pin the system message at the head of input across turns."""
+        mock_response = MockResponse(output_text="Response")
+        fake_openai.responses.create = AsyncMock(return_value=mock_response)
+
+        from agent.core import SupportAgent, SYSTEM_MESSAGE
+
+        agent = SupportAgent(client=fake_openai)
+        await agent.chat("First message")
+        await agent.chat("Second message")
+
+        for call in fake_openai.responses.create.call_args_list:
+            assert "instructions" not in call.kwargs
+            assert call.kwargs["input"][0] == SYSTEM_MESSAGE
+
+        # The system message is not stored in the conversation history
+        assert len(agent.conversation) == 4
+
+    async def test_request_prefix_is_stable_across_turns(self, fake_openai):
+        """Should only append to the previous request's tools and input."""
+        mock_response = MockResponse(output_text="Response")
+        fake_openai.responses.create = AsyncMock(return_value=mock_response)
+
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai)
+        await agent.chat("First message")
+        await agent.chat("Second message")
+
+        first, second = fake_openai.responses.create.call_args_list
+        names = [tool["name"] for tool in first.kwargs["tools"]]
+        assert names == sorted(names)
+        assert second.kwargs["tools"] is first.kwargs["tools"]
+        assert second.kwargs["input"][0] is first.kwargs["input"][0]
+        prefix_len = len(first.kwargs["input"])
+        assert second.kwargs["input"][:prefix_len] == first.kwargs["input"]
+
+    def test_extract_function_calls_found(self, fake_openai):
+        """_extract_function_calls should return function call items."""
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai)
+        call = MockOutputItem("function_call", call_id="1", name="test")
+
+        assert agent._extract_function_calls([call]) == [call]
+
+    def test_extract_function_calls_none(self, fake_openai):
+        """_extract_function_calls should return an empty list without calls."""
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai)
+        output = [MockOutputItem("message", content="text")]
+
+        assert agent._extract_function_calls(output) == []
+
+    def test_extract_function_calls_mixed(self, fake_openai):
+        """_extract_function_calls should keep only calls, in order, from mixed output."""
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai)
+        call1 = MockOutputItem("function_call", call_id="1", name="test")
+        call2 = MockOutputItem("function_call", call_id="2", name="test")
+        output = [
+            MockOutputItem("message", content="text"),
+            call1,
+            MockOutputItem("reasoning"),
+            call2,
+        ]
+
+        assert agent._extract_function_calls(output) == [call1, call2]
+
+    def test_truncate_conversation_when_over_limit(self, fake_openai):
+        """Should evict old turns when history is over MAX_HISTORY_TOKENS."""
+        with patch("agent.core.MAX_HISTORY_TOKENS", 100):
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(client=fake_openai)
+            for i in range(50):
                 msg: EasyInputMessageParam = {"role": "user", "content": f"msg {i}"}
-                agent.conversation.append(msg)
+                agent._add_to_conversation(msg)
 
             agent._truncate_conversation()
 
-            assert len(agent.conversation) == MAX_CONVERSATION_ITEMS
+            assert agent._token_estimate <= 100
+            assert len(agent.conversation) < 50
 
-    def test_truncate_conversation_keeps_recent(self):
+    def test_truncate_conversation_keeps_recent(self, fake_openai):
         """Should keep most recent messages when truncating."""
-        with patch("agent.core.AsyncOpenAI"):
-            from agent.core import SupportAgent, MAX_CONVERSATION_ITEMS
+        with patch("agent.core.MAX_HISTORY_TOKENS", 100):
+            from agent.core import SupportAgent
 
-            agent = SupportAgent()
-            # Add numbered messages
-            for i in range(MAX_CONVERSATION_ITEMS + 5):
+            agent = SupportAgent(client=fake_openai)
+            for i in range(50):
                 msg: EasyInputMessageParam = {"role": "user", "content": f"msg {i}"}
-                agent.conversation.append(msg)
+                agent._add_to_conversation(msg)
 
             agent._truncate_conversation()
 
-            # Should have kept the last MAX_CONVERSATION_ITEMS messages
-            first_item = cast(EasyInputMessageParam, agent.conversation[0])
             last_item = cast(EasyInputMessageParam, agent.conversation[-1])
-            assert first_item.get("content") == "msg 5"
-            assert last_item.get("content") == f"msg {MAX_CONVERSATION_ITEMS + 4}"
+            assert last_item.get("content") == "msg 49"
 
-    def test_truncate_conversation_no_op_when_under_limit(self):
-        """Should not truncate when under limit."""
-        with patch("agent.core.AsyncOpenAI"):
+    def test_truncate_conversation_evicts_whole_turns(self, fake_openai):
+        """Should never separate a function call from its output."""
+        with patch("agent.core.MAX_HISTORY_TOKENS", 1):
             from agent.core import SupportAgent
 
-            agent = SupportAgent()
-            msg1: EasyInputMessageParam = {"role": "user", "content": "msg 1"}
-            msg2: EasyInputMessageParam = {"role": "user", "content": "msg 2"}
-            agent.conversation.append(msg1)
-            agent.conversation.append(msg2)
+            agent = SupportAgent(client=fake_openai)
+            agent._add_to_conversation(
+                {"role": "user", "content": "first"},
+                {"type": "function_call", "call_id": "c1", "name": "t", "arguments": "{}"},
+                {"type": "function_call_output", "call_id": "c1", "output": "x"},
+                {"role": "assistant", "content": "answer"},
+                {"role": "user", "content": "second"},
+            )
 
             agent._truncate_conversation()
 
-            assert len(agent.conversation) == 2
+            assert list(agent.conversation) == [{"role": "user", "content": "second"}]
+            assert len(agent._evicted) == 4
+
+    async def test_summarizes_evicted_turns(self, fake_openai):
+        """Should fold evicted turns into a summary sent after the system prompt."""
+        with patch("agent.core.MAX_HISTORY_TOKENS", 1), patch(
+            "agent.core.SUMMARIZE_AFTER_TURNS", 1
+        ):
+            summary_response = MockResponse(output_text="Alice asked about order 7.")
+            fake_openai.responses.create = AsyncMock(
+                side_effect=[
+                    MockResponse(output_text="First answer"),
+                    summary_response,
+                    MockResponse(output_text="Second answer"),
+                ]
+            )
+
+            from agent.core import SupportAgent, SYSTEM_MESSAGE
+
+            agent = SupportAgent(client=fake_openai)
+            await agent.chat("I'm Alice, where is order 7?")
+            await agent.chat("And when will it arrive?")
+
+            assert agent.summary == "Alice asked about order 7."
+            summary_call = fake_openai.responses.create.call_args_list[1]
+            assert "order 7" in summary_call.kwargs["input"][0]["content"]
+            final_input = fake_openai.responses.create.call_args.kwargs["input"]
+            assert final_input[0] == SYSTEM_MESSAGE
+            assert final_input[1] == {
+                "role": "system",
+                "content": "Prior context summary: Alice asked about order 7.",
+            }
+            assert final_input[2] == {
+                "role": "user",
+                "content": "And when will it arrive?",
+            }
+
+    def test_truncate_conversation_no_op_when_under_limit(self, fake_openai):
+        """Should not truncate when under limit."""
+        from agent.core import SupportAgent
+
+        agent = SupportAgent(client=fake_openai)
+        msg1: EasyInputMessageParam = {"role": "user", "content": "msg 1"}
+        msg2: EasyInputMessageParam = {"role": "user", "content": "msg 2"}
+        agent.conversation.append(msg1)
+        agent.conversation.append(msg2)
+
+        agent._truncate_conversation()
 
-    @pytest.mark.asyncio
-    async def test_tool_timeout_returns_error(self):
-        """Should return error message when tool times out."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            with patch("agent.core.handle_tool_call") as mock_handle:
-                with patch("agent.core.TOOL_TIMEOUT_SECONDS", 0.01):
-                    mock_client = MagicMock()
-                    mock_openai.return_value = mock_client
+        assert len(agent.conversation) == 2
 
-                    # Make handle_tool_call hang
-                    async def slow_handler(*args, **kwargs):
+    async def test_tool_timeout_returns_error(self, fake_openai):
+        """Should time out slow tools while keeping finished siblings' results."""
+        with patch("agent.core.handle_tool_call") as mock_handle:
+            with patch("agent.core.TOOL_TIMEOUT_SECONDS", 0.01):
+                # Make one tool hang
+                async def handler(name, args, on_activity):
+                    if name == "search_policies":
                         await asyncio.sleep(1)
-                        return "result"
+                    return f"{name} result"
+
+                mock_handle.side_effect = handler
+
+                from agent.core import SupportAgent
+
+                agent = SupportAgent(client=fake_openai)
+                outputs = await agent._process_function_calls(
+                    [
+                        MockOutputItem(
+                            "function_call",
+                            call_id="call_1",
+                            name="search_policies",
+                            arguments='{"question": "test"}',
+                        ),
+                        MockOutputItem(
+                            "function_call",
+                            call_id="call_2",
+                            name="query_orders_database",
+                            arguments='{"query": "SELECT 1"}',
+                        ),
+                    ]
+                )
+
+                assert "timed out" in outputs[0]["output"]
+                assert outputs[1]["output"] == '"query_orders_database result"'
 
-                    mock_handle.side_effect = slow_handler
+    async def test_cancelled_tool_returns_error(self, fake_openai):
+        """Should report a tool cancelled from elsewhere as a failed call."""
+        with patch("agent.core.handle_tool_call") as mock_handle:
 
-                    from agent.core import SupportAgent
+            async def handler(name, args, on_activity):
+                raise asyncio.CancelledError
 
-                    agent = SupportAgent()
-                    result = await agent._execute_tool(
-                        "search_policies", '{"question": "test"}'
+            mock_handle.side_effect = handler
+
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(client=fake_openai)
+            outputs = await agent._process_function_calls(
+                [
+                    MockOutputItem(
+                        "function_call",
+                        call_id="call_1",
+                        name="search_policies",
+                        arguments='{"question": "test"}',
                     )
+                ]
+            )
+
+            assert "Error executing search_policies" in outputs[0]["output"]
+            assert "cancelled" in outputs[0]["output"]
+
+    async def test_tool_timeout_error_is_not_round_timeout(self, fake_openai):
+        """Should report a TimeoutError raised by a tool as a failed call."""
+        with patch("agent.core.handle_tool_call") as mock_handle:
 
-                    assert "timed out" in result
+            async def handler(name, args, on_activity):
+                raise TimeoutError("upstream timeout")
 
-    @pytest.mark.asyncio
-    async def test_api_retry_on_transient_error(self):
+            mock_handle.side_effect = handler
+
+            from agent.core import SupportAgent
+
+            agent = SupportAgent(client=fake_openai)
+            outputs = await agent._process_function_calls(
+                [
+                    MockOutputItem(
+                        "function_call",
+                        call_id="call_1",
+                        name="search_policies",
+                        arguments='{"question": "test"}',
+                    )
+                ]
+            )
+
+            assert outputs[0]["output"] == (
+                '"Error executing search_policies: upstream timeout"'
+            )
+
+    async def test_api_retry_on_transient_error(self, async_returns):
         """Should retry API calls on transient errors."""
-        with patch("agent.core.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_openai.return_value = mock_client
+        from agent.core import SupportAgent
+
+        with patch.object(SupportAgent._call_api.retry, "wait", wait_none()):
+            mock_client = SimpleNamespace(responses=SimpleNamespace())
 
             # Fail twice, then succeed
             mock_response = MockResponse(output_text="Success after retry")
-            mock_client.responses.create = AsyncMock(
-                side_effect=[
-                    APIConnectionError(request=MagicMock()),
-                    APIConnectionError(request=MagicMock()),
-                    mock_response,
-                ]
+            mock_client.responses.create = async_returns(
+                APIConnectionError(request=MagicMock()),
+                APIConnectionError(request=MagicMock()),
+                mock_response,
             )
 
-            from agent.core import SupportAgent
-
-            agent = SupportAgent()
+            agent = SupportAgent(client=mock_client)
             result = await agent.chat("Hello")
 
             assert result == "Success after retry"
@@ -0,0 +1,79 @@
+"""Tests for the shared AsyncOpenAI client."""
+
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from agent import openai_client
+from agent.openai_client import close_client, get_client
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    """Start and finish each test without a shared client."""
+    openai_client._clients.clear()
+    yield
+    openai_client._clients.clear()
+
+
+class TestGetClient:
+    """Tests for get_client function."""
+
+    def test_returns_shared_client(self):
+        """Should build the client once and reuse it."""
+        with patch("agent.openai_client.AsyncOpenAI") as mock_openai:
+            first = get_client()
+            second = get_client()
+
+            assert first is second
+            mock_openai.assert_called_once()
+
+    def test_separate_client_per_api_key(self):
+        """Should build one client per API key."""
+        with patch("agent.openai_client.AsyncOpenAI") as mock_openai:
+            mock_openai.side_effect = lambda **kwargs: object()
+            with patch.dict(os.environ, {"OPENAI_API_KEY": "key-a"}):
+                first = get_client()
+            with patch.dict(os.environ, {"OPENAI_API_KEY": "key-b"}):
+                second = get_client()
+            with patch.dict(os.environ, {"OPENAI_API_KEY": "key-a"}):
+                third = get_client()
+
+            assert first is third
+            assert first is not second
+            assert mock_openai.call_count == 2
+
+    def test_agents_share_client(self):
+        """Should give every agent the same client."""
+        with patch("agent.openai_client.AsyncOpenAI"):
+            from agent.core import SupportAgent
+            from agent.sql_generator import SQLGeneratorAgent
+            from agent.sql_reviewer import SQLReviewerAgent
+
+            client = SupportAgent().client
+
+            assert SQLGeneratorAgent().client is client
+            assert SQLReviewerAgent().client is client
+
+    def test_agents_defer_client_until_used(self):
+        """Should not build a client just by constructing an agent."""
+        with patch("agent.openai_client.AsyncOpenAI") as mock_openai:
+            from agent import SQLGeneratorAgent, SQLReviewerAgent, SupportAgent
+
+            SupportAgent()
+            SQLGeneratorAgent()
+            SQLReviewerAgent()
+
+            mock_openai.assert_not_called()
+
+    async def test_close_client(self):
+        """Should close the shared client and build a new one afterwards."""
+        with patch("agent.openai_client.AsyncOpenAI") as mock_openai:
+            mock_openai.return_value.close = AsyncMock()
+            client = get_client()
+
+            await close_client()
+
+            client.close.assert_awaited_once()
+            assert openai_client._clients == {}
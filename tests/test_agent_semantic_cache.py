@@ -0,0 +1,171 @@
+"""Tests for the embedding-based semantic cache."""
+
+import os
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from agent.semantic_cache import SemanticCache, get_semantic_cache, namespace_for
+
+
+def fake_embedding(text: str) -> list[float]:
+    """Embed texts into a tiny space keyed on a few topic words."""
+    topics = ["order", "alice", "return", "shipping"]
+    return [1.0 if topic in text else 0.0 for topic in topics] + [0.1]
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    """Semantic cache with deterministic embeddings."""
+    with patch("agent.semantic_cache.get_embedding", side_effect=fake_embedding):
+        yield SemanticCache(
+            threshold=0.9, ttl_seconds=60, path=str(tmp_path / "cache.npz")
+        )
+
+
+class TestSemanticCache:
+    """Tests for SemanticCache class."""
+
+    async def test_returns_output_for_similar_question(self, cache: SemanticCache):
+        """Should return the cached output for a paraphrased question."""
+        cache.put(await cache.embed("Order status for Alice"), "ns", "SELECT 1")
+
+        embedding = await cache.embed("what's alice's order status?")
+
+        assert cache.get(embedding, "ns") == "SELECT 1"
+
+    async def test_misses_dissimilar_question(self, cache: SemanticCache):
+        """Should return None when no cached question is similar enough."""
+        cache.put(await cache.embed("Order status for Alice"), "ns", "SELECT 1")
+
+        embedding = await cache.embed("What is the return policy?")
+
+        assert cache.get(embedding, "ns") is None
+
+    async def test_namespaces_are_isolated(self, cache: SemanticCache):
+        """Should not share entries across namespaces."""
+        embedding = await cache.embed("Order status for Alice")
+        cache.put(embedding, "schema-a", "SELECT 1")
+
+        assert cache.get(embedding, "schema-b") is None
+
+    async def test_expired_entries_miss(self, cache: SemanticCache):
+        """Should ignore entries older than the TTL."""
+        embedding = await cache.embed("Order status for Alice")
+        cache.put(embedding, "ns", "SELECT 1")
+        cache.ttl_seconds = -1
+
+        assert cache.get(embedding, "ns") is None
+
+    async def test_embed_is_memoized(self, cache: SemanticCache):
+        """Should embed a repeated question only once."""
+        with patch(
+            "agent.semantic_cache.get_embedding", side_effect=fake_embedding
+        ) as mock_embed:
+            await cache.embed("Order status")
+            await cache.embed("  order   STATUS ")
+
+            assert mock_embed.call_count == 1
+
+    async def test_save_and_load(self, cache: SemanticCache):
+        """Should persist entries across cache instances."""
+        embedding = await cache.embed("Order status for Alice")
+        cache.put(embedding, "ns", "SELECT 1")
+        cache.save()
+
+        restored = SemanticCache(threshold=0.9, ttl_seconds=60, path=str(cache.path))
+        restored.load()
+
+        assert restored.get(embedding, "ns") == "SELECT 1"
+
+    def test_disabled_by_default(self):
+        """Should return no shared cache unless explicitly enabled."""
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_semantic_cache() is None
+
+    def test_namespace_is_memoized(self):
+        """Should hash the same prompt parts only once."""
+        namespace = namespace_for("model", "long prompt")
+
+        assert namespace_for("model", "long prompt") is namespace
+        assert namespace_for("other model", "long prompt") != namespace
+
+
+class TestSemanticCacheIntegration:
+    """Tests for semantic cache use by the agents."""
+
+    async def test_generator_skips_llm_on_hit(self, cache: SemanticCache):
+        """Should return remembered SQL for a repeated question without the model."""
+        with patch("agent.sql_generator.get_client") as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+            mock_client.responses.create = AsyncMock()
+
+            from agent.sql_generator import SQLGeneratorAgent
+
+            agent = SQLGeneratorAgent(semantic_cache=cache)
+            await agent.remember("Alice order status", "schema", "SELECT 1")
+            result = await agent.generate("  alice ORDER status", "schema")
+
+            assert result == "SELECT 1"
+            mock_client.responses.create.assert_not_called()
+
+    async def test_generator_requires_exact_question(self, cache: SemanticCache):
+        """Should not reuse SQL for a paraphrase, which may name other values."""
+        with patch("agent.sql_generator.get_client") as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+            mock_response = MagicMock()
+            mock_response.output_text = "SELECT 2"
+            mock_client.responses.create = AsyncMock(return_value=mock_response)
+
+            from agent.sql_generator import SQLGeneratorAgent
+
+            agent = SQLGeneratorAgent(semantic_cache=cache)
+            await agent.remember("Alice order status", "schema", "SELECT 1")
+            result = await agent.generate("order status of alice", "schema")
+
+            assert result == "SELECT 2"
+
+    async def test_generator_bypasses_cache_with_feedback(self, cache: SemanticCache):
+        """Should always call the model when retrying with feedback."""
+        with patch("agent.sql_generator.get_client") as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+            mock_response = MagicMock()
+            mock_response.output_text = "SELECT 2"
+            mock_client.responses.create = AsyncMock(return_value=mock_response)
+
+            from agent.sql_generator import SQLGeneratorAgent
+
+            agent = SQLGeneratorAgent(semantic_cache=cache)
+            await agent.remember("Alice order status", "schema", "SELECT 1")
+            result = await agent.generate(
+                "order status of alice", "schema", feedback="Wrong table"
+            )
+
+            assert result == "SELECT 2"
+
+    async def test_support_agent_caches_pure_answers(self, cache: SemanticCache):
+        """Should answer a repeated tool-free question from the cache."""
+        with patch("agent.core.get_client") as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+
+            mock_response = MagicMock()
+            mock_response.output_text = "I can help with orders."
+            mock_response.output = [MagicMock(type="message")]
+            mock_client.responses.create = AsyncMock(return_value=mock_response)
+
+            from agent.core import SupportAgent
+
+            first = await SupportAgent(semantic_cache=cache).chat(
+                "Can you help with my order?"
+            )
+            agent = SupportAgent(semantic_cache=cache)
+            second = await agent.chat("can you help with my order")
+
+            assert first == second == "I can help with orders."
+            assert mock_client.responses.create.call_count == 1
+            assert len(agent.conversation) == 2
@@ -1,15 +1,24 @@
 """Tests for database layer: connection, models, and seed."""
 
+import asyncio
 import os
 import sqlite3
+import threading
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from database.connection import execute_query, get_connection, get_db_path
+from database.connection import (
+    aexecute_query,
+    execute_query,
+    get_connection,
+    get_db_path,
+    get_read_connection,
+    sql_batch,
+)
 from database.models import init_database
-from database.seed import seed_database
+from database.seed import bootstrap_database, seed_database
 
 
 class TestGetDbPath:
@@ -62,6 +71,120 @@ class TestGetConnection:
             conn.execute("SELECT 1")
 
 
+class TestGetReadConnection:
+    """Tests for get_read_connection function."""
+
+    def test_reuses_connection(self, temp_db_path: Path):
+        """Should return the same connection on repeated calls."""
+        assert get_read_connection() is get_read_connection()
+
+    def test_uses_wal_mode(self, temp_db_path: Path):
+        """Should open the connection in WAL journal mode."""
+        conn = get_read_connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_applies_read_pragmas(self, temp_db_path: Path):
+        """Should size the page cache and keep the connection read-only."""
+        conn = get_read_connection()
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -8000
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+
+    def test_returns_plain_tuples(self, temp_db_path: Path):
+        """Should skip the Row factory, as execute_query zips rows itself."""
+        assert get_read_connection().execute("SELECT 1, 2").fetchone() == (1, 2)
+
+    def test_reopens_on_path_change(self, tmp_path: Path):
+        """Should open a new connection when DATABASE_PATH changes."""
+        with patch.dict(os.environ, {"DATABASE_PATH": str(tmp_path / "a.db")}):
+            first = get_read_connection()
+        with patch.dict(os.environ, {"DATABASE_PATH": str(tmp_path / "b.db")}):
+            second = get_read_connection()
+
+        assert first is not second
+        with pytest.raises(sqlite3.ProgrammingError):
+            first.execute("SELECT 1")
+
+    def test_sees_committed_writes(self, initialized_db: Path):
+        """Should see rows committed by other connections after reuse."""
+        assert execute_query("SELECT COUNT(*) AS count FROM customers")[0]["count"] == 0
+
+        seed_database()
+
+        assert execute_query("SELECT COUNT(*) AS count FROM customers")[0]["count"] == 5
+
+
+class TestSqlBatch:
+    """Tests for sql_batch context manager."""
+
+    async def test_queries_share_snapshot(self, seeded_db: Path):
+        """Should run queries from worker threads in one read transaction."""
+        query = "SELECT COUNT(*) AS count FROM customers"
+
+        async with sql_batch():
+            before = await asyncio.to_thread(execute_query, query)
+            with get_connection() as conn:
+                conn.execute("DELETE FROM order_items")
+                conn.execute("DELETE FROM orders")
+                conn.execute("DELETE FROM customers")
+                conn.commit()
+            during = await asyncio.to_thread(execute_query, query)
+
+        after = execute_query(query)
+
+        assert before == during == [{"count": 5}]
+        assert after == [{"count": 0}]
+
+    async def test_async_queries_join_batch(self, seeded_db: Path):
+        """Should carry the batch into the sqlite executor threads."""
+        async with sql_batch() as batch:
+            await aexecute_query("SELECT 1 AS one")
+            assert batch._conn is not None
+
+    async def test_opens_no_connection_when_unused(self, temp_db_path: Path):
+        """Should not open a connection for a batch without queries."""
+        async with sql_batch() as batch:
+            pass
+
+        assert batch._conn is None
+
+    async def test_nested_batch_joins_outer(self, seeded_db: Path):
+        """Should share the outer batch and keep it open until the outer block ends."""
+        async with sql_batch() as outer:
+            async with sql_batch() as inner:
+                await aexecute_query("SELECT 1 AS one")
+            assert inner is outer
+            assert outer._conn is not None
+
+        assert outer._conn is None
+
+    async def test_rejects_queries_after_close(self, seeded_db: Path):
+        """Should not reopen a connection for a query arriving after the batch ended."""
+        async with sql_batch() as batch:
+            await aexecute_query("SELECT 1 AS one")
+
+        with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+            batch.execute("SELECT 1 AS one")
+        assert batch._conn is None
+
+    async def test_stops_abandoned_queries_before_closing(self, seeded_db: Path):
+        """Should interrupt a query whose task was cancelled before closing."""
+        slow_query = (
+            "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) "
+            "SELECT COUNT(*) FROM n"
+        )
+
+        async with sql_batch() as batch:
+            task = asyncio.ensure_future(aexecute_query(slow_query))
+            # Let the query start on its worker thread, then abandon it
+            while batch._conn is None:
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        assert task.cancelled()
+        assert not batch._pending
+        assert batch._conn is None
+
+
 class TestExecuteQuery:
     """Tests for execute_query function."""
 
@@ -98,12 +221,66 @@ class TestExecuteQuery:
         with pytest.raises(ValueError, match="Only SELECT queries"):
             execute_query("DROP TABLE customers")
 
+    def test_allows_cte_query(self, seeded_db: Path):
+        """Should execute SELECT queries written with a WITH clause."""
+        results = execute_query(
+            "WITH recent AS (SELECT id FROM customers LIMIT 2) "
+            "SELECT COUNT(*) AS count FROM recent"
+        )
+        assert results == [{"count": 2}]
+
+    def test_rejects_cte_write(self, seeded_db: Path):
+        """Should refuse writes hidden behind a WITH clause."""
+        with pytest.raises(sqlite3.OperationalError):
+            execute_query("WITH ids AS (SELECT 1) DELETE FROM customers")
+
+    def test_rejects_select_prefix_of_other_word(self, initialized_db: Path):
+        """Should not treat words merely starting with SELECT as SELECT."""
+        with pytest.raises(ValueError, match="Only SELECT queries"):
+            execute_query("SELECTED FROM customers")
+
+    def test_allows_commented_select(self, seeded_db: Path):
+        """Should allow SELECT queries preceded by comments."""
+        results = execute_query(
+            "/* top customer */\n-- one row\nSELECT name FROM customers LIMIT 1"
+        )
+        assert len(results) == 1
+
+    def test_rejects_commented_write(self, initialized_db: Path):
+        """Should reject writes hidden behind a comment."""
+        with pytest.raises(ValueError, match="Only SELECT"):
+            execute_query("/* SELECT */ DELETE FROM customers")
+
+    def test_rejects_select_inside_line_comment(self, initialized_db: Path):
+        """Should not accept a SELECT keyword that is part of a comment."""
+        with pytest.raises(ValueError, match="Only SELECT"):
+            execute_query("-- SELECT\nDELETE FROM customers")
+
     def test_empty_result(self, seeded_db: Path):
         """Should return empty list when no rows match."""
         results = execute_query("SELECT * FROM customers WHERE email = 'nonexistent@example.com'")
         assert results == []
 
 
+class TestAexecuteQuery:
+    """Tests for aexecute_query function."""
+
+    async def test_runs_on_sqlite_executor(self, seeded_db: Path):
+        """Should run the query on a dedicated sqlite thread."""
+        with patch(
+            "database.connection.execute_query",
+            side_effect=lambda query: [{"thread": threading.current_thread().name}],
+        ):
+            results = await aexecute_query("SELECT 1")
+
+        assert results[0]["thread"].startswith("sqlite")
+
+    async def test_returns_results(self, seeded_db: Path):
+        """Should return the same rows as execute_query."""
+        query = "SELECT name FROM customers ORDER BY id LIMIT 2"
+        assert await aexecute_query(query) == execute_query(query)
+
+
 class TestInitDatabase:
     """Tests for init_database function."""
 
@@ -171,3 +348,23 @@ class TestSeedDatabase:
         results = execute_query("SELECT COUNT(*) as count FROM customers")
         assert results[0]["count"] == 5
 
+
+class TestBootstrapDatabase:
+    """Tests for bootstrap_database function."""
+
+    def test_creates_and_seeds(self, temp_db_path: Path):
+        """Should create the schema and seed data in one call."""
+        bootstrap_database()
+
+        with get_connection() as conn:
+            cursor = conn.execute("SELECT COUNT(*) FROM order_items")
+            assert cursor.fetchone()[0] == 8
+
+    def test_idempotent(self, temp_db_path: Path):
+        """Should not duplicate data when run twice."""
+        bootstrap_database()
+        bootstrap_database()
+
+        with get_connection() as conn:
+            cursor = conn.execute("SELECT COUNT(*) FROM customers")
+            assert cursor.fetchone()[0] == 5
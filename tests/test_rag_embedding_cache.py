@@ -0,0 +1,61 @@
+"""Tests for the disk-backed embedding cache."""
+
+from pathlib import Path
+
+import pytest
+
+from rag.embedding_cache import EmbeddingCache, quantize
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache class."""
+
+    def test_returns_none_for_misses(self, tmp_path: Path):
+        """Should return None for texts that were never stored."""
+        cache = EmbeddingCache(tmp_path / "cache.db")
+
+        assert cache.get_many(["unknown"]) == [None]
+
+    def test_round_trips_embeddings(self, tmp_path: Path):
+        """Should return stored embeddings as float lists in input order."""
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        cache.put_many(["a", "b"], [[0.5, 1.0], [0.25, 2.0]])
+
+        assert cache.get_many(["b", "missing", "a"]) == [
+            [0.25, 2.0],
+            None,
+            [0.5, 1.0],
+        ]
+
+    def test_persists_across_instances(self, tmp_path: Path):
+        """Should keep entries in the cache file."""
+        EmbeddingCache(tmp_path / "cache.db").put_many(["a"], [[1.0]])
+
+        assert EmbeddingCache(tmp_path / "cache.db").get_many(["a"]) == [[1.0]]
+
+    def test_isolates_models(self, tmp_path: Path):
+        """Should not return vectors embedded with another model."""
+        EmbeddingCache(tmp_path / "cache.db", model="model-a").put_many(["a"], [[1.0]])
+
+        cache = EmbeddingCache(tmp_path / "cache.db", model="model-b")
+
+        assert cache.get_many(["a"]) == [None]
+
+    def test_handles_many_keys(self, tmp_path: Path):
+        """Should look up more keys than fit in one query."""
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        texts = [f"chunk {i}" for i in range(1200)]
+        cache.put_many(texts, [[float(i)] for i in range(1200)])
+
+        assert cache.get_many(texts)[-1] == [1199.0]
+
+    def test_stores_half_precision(self, tmp_path: Path):
+        """Should round stored vectors to float16 precision."""
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        cache.put_many(["a"], [[0.1, 1.0]])
+
+        cached = cache.get_many(["a"])[0]
+
+        assert cached == quantize([0.1, 1.0])
+        assert cached != [0.1, 1.0]
+        assert cached[0] == pytest.approx(0.1, abs=1e-3)
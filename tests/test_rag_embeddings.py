@@ -0,0 +1,106 @@
+"""Tests for the OpenAI embeddings wrapper."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rag.embeddings import (
+    MAX_RETRIES,
+    REQUEST_TIMEOUT_SECONDS,
+    _reset_client,
+    get_embedding,
+    get_embeddings,
+    get_embeddings_batched,
+)
+
+
+@pytest.fixture
+def mock_client():
+    """Patch the OpenAI client and record every embeddings request."""
+    _reset_client()
+    with patch("rag.embeddings.OpenAI") as mock_openai:
+        client = MagicMock()
+        mock_openai.return_value = client
+
+        def create_embeddings(model, input):
+            response = MagicMock()
+            # Return items out of order to exercise index sorting
+            response.data = [
+                MagicMock(index=i, embedding=[float(len(text)), float(i)])
+                for i, text in reversed(list(enumerate(input)))
+            ]
+            return response
+
+        client.embeddings.create = MagicMock(side_effect=create_embeddings)
+        yield client
+    _reset_client()
+
+
+class TestGetEmbeddings:
+    """Tests for get_embeddings function."""
+
+    def test_preserves_input_order(self, mock_client):
+        """Should return embeddings in input order."""
+        embeddings = get_embeddings(["a", "bbb"])
+
+        assert embeddings == [[1.0, 0.0], [3.0, 1.0]]
+
+    def test_reuses_client(self, mock_client):
+        """Should create the OpenAI client once across calls."""
+        _reset_client()
+        with patch("rag.embeddings.OpenAI", return_value=mock_client) as mock_openai:
+            get_embeddings(["a"])
+            get_embeddings(["b"])
+
+            mock_openai.assert_called_once_with(
+                timeout=REQUEST_TIMEOUT_SECONDS, max_retries=MAX_RETRIES
+            )
+
+    def test_caches_repeated_texts(self, mock_client):
+        """Should serve normalized repeats from the cache."""
+        first = get_embedding("Return policy")
+        second = get_embedding("  return   POLICY ")
+
+        assert first == second
+        assert mock_client.embeddings.create.call_count == 1
+
+    def test_embeds_only_misses(self, mock_client):
+        """Should send only uncached, unique texts to the API."""
+        get_embedding("cached")
+
+        embeddings = get_embeddings(["new", "cached", "new"])
+
+        last_call = mock_client.embeddings.create.call_args
+        assert last_call.kwargs["input"] == ["new"]
+        assert embeddings[0] == embeddings[2]
+        assert len(embeddings) == 3
+
+
+class TestGetEmbeddingsBatched:
+    """Tests for get_embeddings_batched function."""
+
+    def test_splits_by_item_limit(self, mock_client):
+        """Should send several requests and keep input order."""
+        texts = [f"text {i:02d}" for i in range(5)]
+
+        with patch("rag.embeddings.MAX_BATCH_ITEMS", 2):
+            embeddings = get_embeddings_batched(texts)
+
+        assert mock_client.embeddings.create.call_count == 3
+        assert embeddings == get_embeddings(texts)
+
+    def test_splits_by_token_limit(self, mock_client):
+        """Should start a new batch when the token budget is reached."""
+        with patch("rag.embeddings.MAX_BATCH_TOKENS", 10):
+            get_embeddings_batched(["x" * 20, "y" * 20])
+
+        sizes = [
+            len(call.kwargs["input"])
+            for call in mock_client.embeddings.create.call_args_list
+        ]
+        assert sizes == [1, 1]
+
+    def test_empty_input(self, mock_client):
+        """Should return no embeddings without calling the API."""
+        assert get_embeddings_batched([]) == []
+        mock_client.embeddings.create.assert_not_called()
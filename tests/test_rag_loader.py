@@ -50,6 +50,20 @@ class TestChunkText:
         # Should have multiple chunks
         assert len(chunks) >= 1
 
+    def test_breaks_at_last_paragraph_in_window(self):
+        """Should break at the last paragraph break that fits in the chunk."""
+        text = "a" * 30 + "\n\n" + "b" * 10 + "\n\n\n" + "c" * 40
+        chunks = chunk_text(text, chunk_size=50, overlap=0)
+
+        assert chunks[0] == "a" * 30 + "\n\n" + "b" * 10
+
+    def test_ignores_breaks_past_chunk_end(self):
+        """Should not break at a boundary beyond the chunk window."""
+        text = "a" * 60 + ". " + "b" * 60
+        chunks = chunk_text(text, chunk_size=50, overlap=0)
+
+        assert chunks[0] == "a" * 50
+
     def test_empty_text(self):
         """Empty text should return empty list."""
         chunks = chunk_text("", chunk_size=500)
@@ -139,3 +153,53 @@ class TestLoadPolicies:
         # Title should be derived from filename
         assert documents[0]["title"] == "Refund Policy"
 
+
+    def test_keeps_each_file_chunks_together(self, tmp_path: Path):
+        """Should keep chunks of one file contiguous and in order."""
+        policies_dir = tmp_path / "policies"
+        policies_dir.mkdir()
+        
+        for name in ("alpha", "beta", "gamma"):
+            (policies_dir / f"{name}.md").write_text(
+                f"# {name}\n\n" + "Sentence of policy text. " * 100
+            )
+        
+        documents = load_policies(str(policies_dir))
+        
+        sources = [doc["source"] for doc in documents]
+        for source in set(sources):
+            first = sources.index(source)
+            run = [doc for doc in documents if doc["source"] == source]
+            assert documents[first : first + len(run)] == run
+            assert [doc["chunk_index"] for doc in run] == list(range(len(run)))
+
+    def test_extracts_title_after_preamble(self, tmp_path: Path):
+        """Should find the first heading even when it is not the first line."""
+        policies_dir = tmp_path / "policies"
+        policies_dir.mkdir()
+        
+        (policies_dir / "warranty.md").write_text(
+            "Last updated 2024.\n## Overview\n# Warranty Terms\n\nDetails."
+        )
+        
+        documents = load_policies(str(policies_dir))
+        
+        assert documents[0]["title"] == "Warranty Terms"
+
+    def test_normalizes_crlf_line_endings(self, tmp_path: Path):
+        """Should chunk CRLF files like LF files, without carriage returns."""
+        policies_dir = tmp_path / "policies"
+        policies_dir.mkdir()
+        
+        text = "# Returns\n\n" + "Items may be returned within 30 days.\n\n" * 40
+        (policies_dir / "lf.md").write_bytes(text.encode())
+        (policies_dir / "crlf.md").write_bytes(text.replace("\n", "\r\n").encode())
+        
+        documents = load_policies(str(policies_dir))
+        
+        chunks = {"lf.md": [], "crlf.md": []}
+        for doc in documents:
+            chunks[Path(doc["source"]).name].append(doc["content"])
+        lf, crlf = chunks["lf.md"], chunks["crlf.md"]
+        assert crlf == lf
+        assert not any("\r" in chunk for chunk in crlf)
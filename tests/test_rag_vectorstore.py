@@ -4,9 +4,12 @@ import os
 from pathlib import Path
 from unittest.mock import patch
 
+import chromadb
+import numpy as np
 import pytest
+from chromadb.config import Settings
 
-from rag.vectorstore import PolicyStore
+from rag.vectorstore import PolicyEmbeddingFunction, PolicyStore, get_policy_store
 
 
 class TestPolicyStore:
@@ -37,6 +40,63 @@ class TestPolicyStore:
         assert count >= 2  # At least 2 documents
         assert store.is_empty() is False
 
+    def test_is_empty_skips_count_once_loaded(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Should not count the collection again once it holds documents."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        store.load_documents(str(temp_policies_dir))
+
+        with patch.object(store.collection, "count") as mock_count:
+            assert store.is_empty() is False
+            mock_count.assert_not_called()
+
+    def test_reindex_reuses_cached_embeddings(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Should not re-embed unchanged chunks after the store is cleared."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        store.load_documents(str(temp_policies_dir))
+        store.clear()
+
+        with patch("rag.vectorstore.get_embeddings_batched") as mock_embed:
+            count = store.load_documents(str(temp_policies_dir))
+
+        mock_embed.assert_not_called()
+        assert store.collection.count() == count
+
+    def test_embeds_duplicate_chunks_once(
+        self, temp_chroma_path: Path, tmp_path: Path, mock_embeddings
+    ):
+        """Should embed identical chunks from different files once."""
+        policies_dir = tmp_path / "policies"
+        policies_dir.mkdir()
+        for name in ("returns", "shipping"):
+            (policies_dir / f"{name}.md").write_text("Contact support@example.com.")
+        
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        with patch(
+            "rag.vectorstore.get_embeddings_batched",
+            side_effect=lambda texts: [[1.0, 0.0] for _ in texts],
+        ) as mock_embed:
+            count = store.load_documents(str(policies_dir))
+        
+        mock_embed.assert_called_once_with(["Contact support@example.com."])
+        assert store.collection.count() == count == 2
+
+    def test_upserts_in_client_sized_batches(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Should split the upsert when it exceeds the client's batch limit."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        with patch.object(store.client, "get_max_batch_size", return_value=1), patch.object(
+            store.collection, "upsert", wraps=store.collection.upsert
+        ) as mock_upsert:
+            count = store.load_documents(str(temp_policies_dir))
+        
+        assert mock_upsert.call_count == count > 1
+        assert store.collection.count() == count
+
     def test_load_documents_empty_dir(self, temp_chroma_path: Path, tmp_path: Path, mock_embeddings):
         """Should return 0 when no documents to load."""
         empty_dir = tmp_path / "empty_policies"
@@ -81,6 +141,76 @@ class TestPolicyStore:
         
         assert results == []
 
+    def test_search_caches_repeated_queries(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Repeated normalized queries should not hit the collection again."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        store.load_documents(str(temp_policies_dir))
+        
+        with patch.object(
+            store.collection, "query", wraps=store.collection.query
+        ) as mock_query:
+            first = store.search("Return policy", n_results=2)
+            second = store.search("  return policy ", n_results=2)
+            
+            assert first == second
+            assert mock_query.call_count == 1
+
+    def test_search_many_shares_one_query(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Distinct uncached queries should share a single collection query."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        store.load_documents(str(temp_policies_dir))
+        cached = store.search("shipping", n_results=2)
+
+        with patch.object(
+            store.collection, "query", wraps=store.collection.query
+        ) as mock_query:
+            results = store.search_many(
+                ["return policy", "Shipping", "warranty", "return policy"],
+                n_results=2,
+            )
+
+            assert mock_query.call_count == 1
+            assert mock_query.call_args.kwargs["query_texts"] == [
+                "return policy",
+                "warranty",
+            ]
+
+        assert len(results) == 4
+        assert results[1] == cached
+        assert results[0] == results[3] == store.search("return policy", n_results=2)
+
+    def test_search_embeds_original_query(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """The normalized query should only key the cache, not be embedded."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        store.load_documents(str(temp_policies_dir))
+
+        with patch.object(
+            store.collection, "query", wraps=store.collection.query
+        ) as mock_query:
+            store.search("  Return Policy for iPhone ", n_results=2)
+
+            assert mock_query.call_args.kwargs["query_texts"] == [
+                "  Return Policy for iPhone "
+            ]
+
+    def test_reload_invalidates_search_cache(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Loading documents should drop cached search results."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        
+        assert store.search("shipping") == []
+        
+        store.load_documents(str(temp_policies_dir))
+        
+        assert len(store.search("shipping")) > 0
+
     def test_clear(
         self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
     ):
@@ -94,6 +224,81 @@ class TestPolicyStore:
         
         assert store.is_empty() is True
 
+    def test_clear_keeps_collection(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Clear should empty the existing collection so it can be reloaded."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        count = store.load_documents(str(temp_policies_dir))
+        collection_id = store.collection.id
+        
+        store.clear()
+        store.clear()
+        
+        assert store.collection.id == collection_id
+        assert store.load_documents(str(temp_policies_dir)) == count
+        assert store.collection.count() == count
+
+    def test_tunes_search_ef_of_existing_collection(
+        self, temp_chroma_path: Path, mock_embeddings
+    ):
+        """Should lower ef_search on collections created with the default."""
+        client = chromadb.PersistentClient(
+            path=str(temp_chroma_path), settings=Settings(anonymized_telemetry=False)
+        )
+        client.get_or_create_collection(
+            PolicyStore.COLLECTION_NAME,
+            metadata={"hnsw:space": PolicyStore.DISTANCE_SPACE},
+            embedding_function=PolicyEmbeddingFunction(),
+        )
+
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+
+        hnsw = store.collection.configuration["hnsw"]
+        assert hnsw["ef_search"] == PolicyStore.SEARCH_EF
+
+    def test_rebuilds_collection_with_other_space(
+        self, temp_chroma_path: Path, mock_embeddings, caplog
+    ):
+        """Should drop and recreate a collection persisted with another space."""
+        client = chromadb.PersistentClient(
+            path=str(temp_chroma_path), settings=Settings(anonymized_telemetry=False)
+        )
+        client.get_or_create_collection(
+            PolicyStore.COLLECTION_NAME,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=PolicyEmbeddingFunction(),
+        )
+
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+
+        assert store.collection.configuration["hnsw"]["space"] == PolicyStore.DISTANCE_SPACE
+        assert "Rebuilding collection" in caplog.text
+
+    def test_keeps_collection_on_unrelated_error(
+        self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
+    ):
+        """Should raise other errors rather than dropping the persisted index."""
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        count = store.load_documents(str(temp_policies_dir))
+
+        with patch.object(
+            PolicyStore,
+            "_get_or_create_collection",
+            side_effect=ValueError("invalid argument"),
+        ):
+            with pytest.raises(ValueError, match="invalid argument"):
+                PolicyStore(persist_dir=str(temp_chroma_path))
+
+        assert PolicyStore(persist_dir=str(temp_chroma_path)).collection.count() == count
+
+    def test_reopening_reuses_client(self, temp_chroma_path: Path, mock_embeddings):
+        """Stores on the same directory should share one ChromaDB client."""
+        first = PolicyStore(persist_dir=str(temp_chroma_path))
+        second = PolicyStore(persist_dir=f"{temp_chroma_path}/.")
+        
+        assert first.client is second.client
+
     def test_uses_env_path(self, tmp_path: Path, mock_embeddings):
         """Should use CHROMA_PATH environment variable."""
         chroma_path = tmp_path / "env_chroma"
@@ -117,3 +322,68 @@ class TestPolicyStore:
         if results:
             assert isinstance(results[0]["distance"], float)
 
+
+    def test_identical_text_has_zero_distance(
+        self, temp_chroma_path: Path, tmp_path: Path, mock_embeddings
+    ):
+        """Normalized inner product should give cosine distance."""
+        policies_dir = tmp_path / "policies"
+        policies_dir.mkdir()
+        text = "refunds are issued within five days."
+        (policies_dir / "refunds.md").write_text(text)
+        
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        store.load_documents(str(policies_dir))
+        
+        results = store.search(text, n_results=1)
+        
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-3)
+
+
+    def test_replaces_collection_with_other_embedding_function(
+        self, temp_chroma_path: Path, mock_embeddings
+    ):
+        """Should rebuild a collection persisted with another embedder."""
+        client = chromadb.PersistentClient(
+            path=str(temp_chroma_path), settings=Settings(anonymized_telemetry=False)
+        )
+        legacy = client.get_or_create_collection(PolicyStore.COLLECTION_NAME)
+        legacy.add(ids=["old"], embeddings=[[1.0, 0.0]], documents=["old"])
+        
+        store = PolicyStore(persist_dir=str(temp_chroma_path))
+        
+        assert store.is_empty() is True
+
+
+class TestPolicyEmbeddingFunction:
+    """Tests for PolicyEmbeddingFunction class."""
+
+    def test_returns_unit_vectors(self, mock_embeddings):
+        """Should embed texts as unit-length vectors."""
+        embeddings = PolicyEmbeddingFunction()(["refunds", "shipping"])
+        
+        assert len(embeddings) == 2
+        for embedding in embeddings:
+            assert np.linalg.norm(embedding) == pytest.approx(1.0, abs=1e-5)
+
+    def test_round_trips_config(self):
+        """Should rebuild itself from the config persisted with a collection."""
+        function = PolicyEmbeddingFunction(model="text-embedding-3-large")
+        
+        rebuilt = PolicyEmbeddingFunction.build_from_config(function.get_config())
+        
+        assert rebuilt.model == "text-embedding-3-large"
+
+class TestGetPolicyStore:
+    """Tests for get_policy_store function."""
+
+    def test_reuses_store_per_directory(
+        self, temp_chroma_path: Path, tmp_path: Path, mock_embeddings
+    ):
+        """Should open one store per directory, defaulting to CHROMA_PATH."""
+        other_path = tmp_path / "other_chroma"
+
+        store = get_policy_store()
+
+        assert get_policy_store(str(temp_chroma_path)) is store
+        assert get_policy_store(str(other_path)) is not store
@@ -1,16 +1,35 @@
 """Tests for tool handlers: database and policies."""
 
+import asyncio
 import os
+import threading
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from tools.handlers import database, policies
+
+
+@pytest.fixture(autouse=True)
+def reset_sql_agents():
+    """Build fresh SQL agents in each test, from the classes it patches."""
+    database._generator = database._reviewer = None
+    yield
+    database._generator = database._reviewer = None
+
+
+@pytest.fixture(autouse=True)
+def clear_policy_answers():
+    """Start each test without policy answers cached by earlier tests."""
+    policies._answers.clear()
+    yield
+    policies._answers.clear()
+
 
 class TestQueryOrdersDatabase:
     """Tests for query_orders_database handler."""
 
-    @pytest.mark.asyncio
     async def test_returns_json_results(self, seeded_db: Path):
         """Should return JSON formatted query results."""
         # Mock the SQL generator and reviewer
@@ -32,7 +51,6 @@ class TestQueryOrdersDatabase:
 
                 assert "Alice Johnson" in result or "name" in result
 
-    @pytest.mark.asyncio
     async def test_handles_no_results(self, seeded_db: Path):
         """Should handle queries that return no results."""
         with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
@@ -53,7 +71,6 @@ class TestQueryOrdersDatabase:
 
                 assert "No results found" in result
 
-    @pytest.mark.asyncio
     async def test_retries_on_feedback(self, seeded_db: Path):
         """Should retry when reviewer provides feedback."""
         with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
@@ -77,8 +94,8 @@ class TestQueryOrdersDatabase:
 
                 from tools.handlers.database import query_orders_database
 
-                # Patch execute_query to handle the bad first query
-                with patch("tools.handlers.database.execute_query") as mock_exec:
+                # Patch aexecute_query to handle the bad first query
+                with patch("tools.handlers.database.aexecute_query") as mock_exec:
                     mock_exec.side_effect = [
                         Exception("no such table: wrong_table"),
                         [{"name": "Alice Johnson"}],
@@ -89,7 +106,223 @@ class TestQueryOrdersDatabase:
                     # Should have retried (at least 2 generate calls)
                     assert mock_generator.generate.call_count >= 2
 
-    @pytest.mark.asyncio
+    async def test_rejects_invalid_sql_without_review(self, seeded_db: Path):
+        """Should send uncompilable SQL back to the generator without review."""
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(
+                    side_effect=[
+                        "SELECT nickname FROM customers",
+                        "SELECT name FROM customers LIMIT 1",
+                    ]
+                )
+                mock_generator.remember = AsyncMock()
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value=None)
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                result = await query_orders_database("Get a customer name")
+
+                assert "Alice Johnson" in result
+                mock_reviewer.review.assert_called_once()
+                feedback = mock_generator.generate.call_args_list[1].args[2]
+                assert "no such column: nickname" in feedback
+                assert "Available tables and columns" in feedback
+
+    async def test_rejects_non_select_without_running(self, seeded_db: Path):
+        """Should send non-SELECT SQL back without executing or reviewing it."""
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(
+                    side_effect=[
+                        "DELETE FROM customers",
+                        "SELECT name FROM customers LIMIT 1",
+                    ]
+                )
+                mock_generator.remember = AsyncMock()
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value=None)
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import (
+                    NOT_SELECT_FEEDBACK,
+                    query_orders_database,
+                )
+
+                with patch(
+                    "tools.handlers.database.aexecute_query",
+                    AsyncMock(return_value=[{"name": "Alice Johnson"}]),
+                ) as mock_exec:
+                    result = await query_orders_database("Get a customer name")
+
+                assert "Alice Johnson" in result
+                mock_exec.assert_called_once_with("SELECT name FROM customers LIMIT 1")
+                mock_reviewer.review.assert_called_once()
+                feedback = mock_generator.generate.call_args_list[1].args[2]
+                assert feedback == NOT_SELECT_FEEDBACK
+
+    async def test_stops_when_generator_repeats_query(self, seeded_db: Path):
+        """Should give up once the generator returns its last query again."""
+        callback_calls = []
+
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(
+                    return_value="SELECT email FROM customers LIMIT 1"
+                )
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value="Select the name")
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                with patch.dict(os.environ, {"SQL_SPECULATION_ENABLED": "false"}):
+                    result = await query_orders_database(
+                        "Get a customer name",
+                        on_agent_activity=lambda *call: callback_calls.append(call),
+                    )
+
+                assert "alice@example.com" in result
+                assert mock_generator.generate.call_count == 2
+                mock_reviewer.review.assert_called_once()
+                assert callback_calls[-1] == (
+                    "Database",
+                    "giving_up",
+                    {"attempt": 2, "reason": "repeated query"},
+                )
+
+    async def test_stops_on_repeated_feedback(self, seeded_db: Path):
+        """Should give up once the same feedback comes back twice in a row."""
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(
+                    side_effect=[
+                        "SELECT email FROM customers LIMIT 1",
+                        "SELECT phone FROM customers LIMIT 1",
+                        "SELECT id FROM customers LIMIT 1",
+                    ]
+                )
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value="Select the name")
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                with patch.dict(os.environ, {"SQL_SPECULATION_ENABLED": "false"}):
+                    await query_orders_database("Get a customer name")
+
+                assert mock_generator.generate.call_count == 2
+                assert mock_reviewer.review.call_count == 2
+
+    async def test_generates_alternative_during_review(self, seeded_db: Path):
+        """Should overlap generating the next query with reviewing this one."""
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                candidates = iter(
+                    ["SELECT email FROM customers", "SELECT name FROM customers"]
+                )
+
+                async def slow_generate(question, schema, feedback=None, on_activity=None):
+                    await asyncio.sleep(0.2)
+                    return next(candidates)
+
+                async def slow_review(question, schema, sql, results, attempt, on_activity):
+                    await asyncio.sleep(0.2)
+                    return None if "name" in sql else "Select the name column"
+
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(side_effect=slow_generate)
+                mock_generator.remember = AsyncMock()
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(side_effect=slow_review)
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                callback = MagicMock()
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                with patch.dict(os.environ, {"SQL_SPECULATION_ENABLED": "true"}):
+                    result = await query_orders_database(
+                        "Get customer names", on_agent_activity=callback
+                    )
+                elapsed = loop.time() - started
+
+                assert "Alice Johnson" in result
+                assert mock_reviewer.review.call_count == 2
+                # One generation overlapped the first review
+                assert elapsed < 0.7
+                # The speculative generation reported no activity
+                on_activity = [
+                    c.kwargs["on_activity"] for c in mock_generator.generate.call_args_list
+                ]
+                assert on_activity[0] is callback
+                assert on_activity[1:] == [None] * (len(on_activity) - 1)
+
+    async def test_skips_speculation_when_disabled(self, seeded_db: Path):
+        """Should generate only on demand when speculation is turned off."""
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(
+                    return_value="SELECT name FROM customers LIMIT 1"
+                )
+                mock_generator.remember = AsyncMock()
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value=None)
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                with patch.dict(os.environ, {"SQL_SPECULATION_ENABLED": "false"}):
+                    result = await query_orders_database("Get a customer name")
+
+                assert "Alice Johnson" in result
+                mock_generator.generate.assert_called_once()
+
+    async def test_no_speculative_generation_by_default(self, seeded_db: Path):
+        """Should make one generation for a query the reviewer approves."""
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(
+                    return_value="SELECT name FROM customers LIMIT 1"
+                )
+                mock_generator.remember = AsyncMock()
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value=None)
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                with patch.dict(os.environ):
+                    os.environ.pop("SQL_SPECULATION_ENABLED", None)
+                    result = await query_orders_database("Get a customer name")
+
+                assert "Alice Johnson" in result
+                mock_generator.generate.assert_called_once()
+                mock_reviewer.review.assert_called_once()
+
     async def test_invokes_agent_callback(self, seeded_db: Path):
         """Should invoke agent activity callback."""
         callback_calls = []
@@ -120,10 +353,36 @@ class TestQueryOrdersDatabase:
                 assert any(call[0] == "Database" for call in callback_calls)
 
 
+    async def test_reuses_agents_across_calls(self, seeded_db: Path):
+        """Should build the agents once and pass each call's callback."""
+        callback = MagicMock()
+
+        with patch("tools.handlers.database.SQLGeneratorAgent") as mock_gen_cls:
+            with patch("tools.handlers.database.SQLReviewerAgent") as mock_rev_cls:
+                mock_generator = MagicMock()
+                mock_generator.generate = AsyncMock(return_value="SELECT 1")
+                mock_generator.remember = AsyncMock()
+                mock_gen_cls.return_value = mock_generator
+
+                mock_reviewer = MagicMock()
+                mock_reviewer.review = AsyncMock(return_value=None)
+                mock_rev_cls.return_value = mock_reviewer
+
+                from tools.handlers.database import query_orders_database
+
+                with patch.dict(os.environ, {"SQL_SPECULATION_ENABLED": "false"}):
+                    await query_orders_database("First")
+                    await query_orders_database("Second", on_agent_activity=callback)
+
+                mock_gen_cls.assert_called_once()
+                mock_rev_cls.assert_called_once()
+                generate_call = mock_generator.generate.call_args
+                assert generate_call.kwargs["on_activity"] is callback
+                assert mock_reviewer.review.call_args.args[-1] is callback
+
 class TestSearchPolicies:
     """Tests for search_policies handler."""
 
-    @pytest.mark.asyncio
     async def test_returns_formatted_results(
         self, temp_chroma_path: Path, temp_policies_dir: Path, mock_embeddings
     ):
@@ -144,7 +403,6 @@ class TestSearchPolicies:
             # Should contain formatted content
             assert isinstance(result, str)
 
-    @pytest.mark.asyncio
     async def test_handles_no_results(self, temp_chroma_path: Path, mock_embeddings):
         """Should handle when no policies match."""
         with patch.dict(os.environ, {"CHROMA_PATH": str(temp_chroma_path)}):
@@ -152,12 +410,14 @@ class TestSearchPolicies:
             policies._policy_store = None
 
             # Mock search to return empty
-            with patch("tools.handlers.policies.PolicyStore") as mock_store_cls:
+            with patch(
+                "tools.handlers.policies.get_shared_policy_store"
+            ) as mock_get_store:
                 mock_store = MagicMock()
                 mock_store.is_empty.return_value = True
                 mock_store.load_documents.return_value = 0
-                mock_store.search.return_value = []
-                mock_store_cls.return_value = mock_store
+                mock_store.search_many.return_value = [[]]
+                mock_get_store.return_value = mock_store
 
                 from tools.handlers.policies import search_policies
 
@@ -168,7 +428,75 @@ class TestSearchPolicies:
 
                 assert "No relevant policies found" in result
 
-    @pytest.mark.asyncio
+    async def test_loads_store_off_event_loop(self):
+        """Opening and loading the store should not block the event loop."""
+        load_threads = []
+        mock_store = MagicMock()
+        mock_store.is_empty.return_value = True
+        mock_store.load_documents.side_effect = lambda: load_threads.append(
+            threading.get_ident()
+        )
+        mock_store.search_many.return_value = [[]]
+
+        with patch.object(policies, "_policy_store", None), patch(
+            "tools.handlers.policies.get_shared_policy_store",
+            return_value=mock_store,
+        ):
+            await policies.search_policies("refund window")
+
+        assert load_threads and load_threads[0] != threading.get_ident()
+
+    async def test_batches_concurrent_searches(self):
+        """Concurrent searches should share one search_many call."""
+        mock_store = MagicMock()
+        mock_store.search_many.side_effect = lambda questions, n: [
+            [{"title": q, "distance": 0.1, "content": "text"}] for q in questions
+        ]
+
+        with patch.object(policies, "_policy_store", mock_store):
+            first, second = await asyncio.gather(
+                policies.search_policies("returns"),
+                policies.search_policies("shipping"),
+            )
+
+        mock_store.search_many.assert_called_once_with(["returns", "shipping"], 3)
+        assert first.startswith("**returns**")
+        assert second.startswith("**shipping**")
+
+    async def test_batch_error_reaches_every_search(self):
+        """A failing batch should fail each of its searches."""
+        mock_store = MagicMock()
+        mock_store.search_many.side_effect = RuntimeError("index unavailable")
+
+        with patch.object(policies, "_policy_store", mock_store):
+            results = await asyncio.gather(
+                policies.search_policies("returns"),
+                policies.search_policies("shipping"),
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert policies._pending == []
+
+    async def test_caches_answers_per_store_version(self):
+        """Repeated questions should be answered without searching again."""
+        mock_store = MagicMock()
+        mock_store.version = 1
+        mock_store.search_many.return_value = [
+            [{"title": "Returns", "distance": 0.1, "content": "30 days"}]
+        ]
+
+        with patch.object(policies, "_policy_store", mock_store):
+            first = await policies.search_policies("What is the return policy?")
+            second = await policies.search_policies("what is the  RETURN policy")
+            assert mock_store.search_many.call_count == 1
+
+            mock_store.version = 2
+            third = await policies.search_policies("What is the return policy?")
+            assert mock_store.search_many.call_count == 2
+
+        assert first == second == third
+
     async def test_lazy_initialization(self, temp_chroma_path: Path, mock_embeddings):
         """Policy store should be lazily initialized."""
         with patch.dict(os.environ, {"CHROMA_PATH": str(temp_chroma_path)}):
@@ -1,9 +1,12 @@
 """Tests for tools router: tool routing and execution."""
 
+import asyncio
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from tools import router
+
 
 class TestToolHandlers:
     """Tests for TOOL_HANDLERS registry."""
@@ -24,14 +27,13 @@ class TestToolHandlers:
 class TestHandleToolCall:
     """Tests for handle_tool_call function."""
 
-    @pytest.mark.asyncio
     async def test_routes_to_query_orders(self):
         """Should route query_orders_database to correct handler."""
         from tools.router import handle_tool_call
 
         with patch(
             "tools.router.TOOL_HANDLERS",
-            {"query_orders_database": AsyncMock(return_value="mock result")},
+            {"query_orders_database": (AsyncMock(return_value="mock result"), True)},
         ):
             result = await handle_tool_call(
                 "query_orders_database",
@@ -40,14 +42,13 @@ class TestHandleToolCall:
 
             assert result == "mock result"
 
-    @pytest.mark.asyncio
     async def test_routes_to_search_policies(self):
         """Should route search_policies to correct handler."""
         from tools.router import handle_tool_call
 
         with patch(
             "tools.router.TOOL_HANDLERS",
-            {"search_policies": AsyncMock(return_value="policy result")},
+            {"search_policies": (AsyncMock(return_value="policy result"), False)},
         ):
             result = await handle_tool_call(
                 "search_policies",
@@ -56,7 +57,6 @@ class TestHandleToolCall:
 
             assert result == "policy result"
 
-    @pytest.mark.asyncio
     async def test_raises_for_unknown_tool(self):
         """Should raise ValueError for unknown tool names."""
         from tools.router import handle_tool_call
@@ -64,21 +64,19 @@ class TestHandleToolCall:
         with pytest.raises(ValueError, match="Unknown tool"):
             await handle_tool_call("unknown_tool", {})
 
-    @pytest.mark.asyncio
     async def test_returns_error_on_handler_exception(self):
         """Should return error string when handler raises."""
         from tools.router import handle_tool_call
 
         with patch(
             "tools.router.TOOL_HANDLERS",
-            {"failing_tool": AsyncMock(side_effect=RuntimeError("Handler failed"))},
+            {"failing_tool": (AsyncMock(side_effect=RuntimeError("Handler failed")), False)},
         ):
             result = await handle_tool_call("failing_tool", {})
 
             assert "Error executing failing_tool" in result
             assert "Handler failed" in result
 
-    @pytest.mark.asyncio
     async def test_passes_agent_callback_to_supported_tools(self):
         """Should pass agent callback to tools that support it."""
         from tools.router import handle_tool_call
@@ -86,20 +84,20 @@ class TestHandleToolCall:
         mock_handler = AsyncMock(return_value="result")
         mock_callback = lambda name, action, details: None
 
-        with patch("tools.router.TOOL_HANDLERS", {"query_orders_database": mock_handler}):
-            with patch("tools.router.TOOLS_WITH_AGENT_CALLBACK", {"query_orders_database"}):
-                await handle_tool_call(
-                    "query_orders_database",
-                    {"query": "SELECT 1"},
-                    on_agent_activity=mock_callback,
-                )
+        with patch(
+            "tools.router.TOOL_HANDLERS", {"query_orders_database": (mock_handler, True)}
+        ):
+            await handle_tool_call(
+                "query_orders_database",
+                {"query": "SELECT 1"},
+                on_agent_activity=mock_callback,
+            )
 
-                # Verify callback was passed
-                mock_handler.assert_called_once()
-                call_kwargs = mock_handler.call_args.kwargs
-                assert "on_agent_activity" in call_kwargs
+            # Verify callback was passed
+            mock_handler.assert_called_once()
+            call_kwargs = mock_handler.call_args.kwargs
+            assert "on_agent_activity" in call_kwargs
 
-    @pytest.mark.asyncio
     async def test_does_not_pass_callback_to_unsupported_tools(self):
         """Should not pass callback to tools that don't support it."""
         from tools.router import handle_tool_call
@@ -107,15 +105,182 @@ class TestHandleToolCall:
         mock_handler = AsyncMock(return_value="result")
         mock_callback = lambda name, action, details: None
 
-        with patch("tools.router.TOOL_HANDLERS", {"search_policies": mock_handler}):
-            with patch("tools.router.TOOLS_WITH_AGENT_CALLBACK", set()):
-                await handle_tool_call(
-                    "search_policies",
-                    {"question": "test"},
-                    on_agent_activity=mock_callback,
+        with patch(
+            "tools.router.TOOL_HANDLERS", {"search_policies": (mock_handler, False)}
+        ):
+            await handle_tool_call(
+                "search_policies",
+                {"question": "test"},
+                on_agent_activity=mock_callback,
+            )
+
+            # Verify callback was NOT passed
+            mock_handler.assert_called_once()
+            call_kwargs = mock_handler.call_args.kwargs
+            assert "on_agent_activity" not in call_kwargs
+
+
+class TestInflightCalls:
+    """Tests for coalescing of concurrent identical tool calls."""
+
+    async def test_concurrent_duplicates_share_one_call(self):
+        """Should run the handler once for identical calls made together."""
+        release = asyncio.Event()
+
+        async def slow_search(question):
+            await release.wait()
+            return f"answer to {question}"
+
+        mock_handler = AsyncMock(side_effect=slow_search)
+
+        with patch.object(
+            router, "TOOL_HANDLERS", {"search_policies": (mock_handler, False)}
+        ):
+            calls = [
+                asyncio.ensure_future(
+                    router.handle_tool_call("search_policies", {"question": "returns"})
                 )
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*calls)
+
+        assert results == ["answer to returns"] * 3
+        assert mock_handler.await_count == 1
+        assert not router._inflight
+
+    async def test_cancelled_waiter_does_not_cancel_call(self):
+        """Should keep the shared call running when one waiter is cancelled."""
+        release = asyncio.Event()
+
+        async def slow_search(question):
+            await release.wait()
+            return "answer"
+
+        with patch.object(
+            router,
+            "TOOL_HANDLERS",
+            {"search_policies": (AsyncMock(side_effect=slow_search), False)},
+        ):
+            first = asyncio.ensure_future(
+                router.handle_tool_call("search_policies", {"question": "returns"})
+            )
+            waiter = asyncio.ensure_future(
+                router.handle_tool_call("search_policies", {"question": "returns"})
+            )
+            await asyncio.sleep(0)
+            waiter.cancel()
+            release.set()
+
+            assert await first == "answer"
+            assert waiter.cancelled()
+
+    async def test_waiters_share_error_result(self):
+        """Should give waiters the error result of the shared call."""
+        release = asyncio.Event()
+
+        async def failing_search(question):
+            await release.wait()
+            raise RuntimeError("down")
+
+        with patch.object(
+            router,
+            "TOOL_HANDLERS",
+            {"search_policies": (AsyncMock(side_effect=failing_search), False)},
+        ):
+            calls = [
+                asyncio.ensure_future(
+                    router.handle_tool_call("search_policies", {"question": "returns"})
+                )
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*calls)
+
+        assert results == ["Error executing search_policies: down"] * 2
+
+    async def test_cancelled_call_does_not_cancel_waiters(self):
+        """Should rerun the call for waiters when the running caller is cancelled."""
+        release = asyncio.Event()
+
+        async def slow_search(question):
+            await release.wait()
+            return "answer"
+
+        mock_handler = AsyncMock(side_effect=slow_search)
+
+        with patch.object(
+            router, "TOOL_HANDLERS", {"search_policies": (mock_handler, False)}
+        ):
+            first = asyncio.ensure_future(
+                router.handle_tool_call("search_policies", {"question": "returns"})
+            )
+            waiter = asyncio.ensure_future(
+                router.handle_tool_call("search_policies", {"question": "returns"})
+            )
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.sleep(0)
+            release.set()
+
+            assert await waiter == "answer"
+            assert first.cancelled()
+            assert mock_handler.await_count == 2
+            assert not router._inflight
+
+
+class TestValidateArguments:
+    """Tests for argument validation against the tool schemas."""
+
+    @pytest.mark.parametrize(
+        "arguments, message",
+        [
+            ({}, "missing required arguments: question"),
+            ({"question": "x", "limit": 3}, "unexpected argument: limit"),
+            ({"question": 42}, "argument question must be of type string"),
+        ],
+    )
+    async def test_rejects_invalid_arguments(self, arguments, message):
+        """Should report invalid arguments without calling the handler."""
+        from tools.router import handle_tool_call
+
+        mock_handler = AsyncMock(return_value="result")
+
+        with patch(
+            "tools.router.TOOL_HANDLERS", {"search_policies": (mock_handler, False)}
+        ):
+            result = await handle_tool_call("search_policies", arguments)
+
+        assert result == f"Error executing search_policies: {message}"
+        mock_handler.assert_not_called()
+
+    @pytest.mark.parametrize("json_type", ["integer", "number"])
+    async def test_rejects_bool_for_numeric_types(self, json_type):
+        """Should not accept a JSON boolean where a number is expected."""
+        from tools.router import handle_tool_call
+
+        mock_handler = AsyncMock(return_value="result")
+
+        with patch(
+            "tools.router.TOOL_HANDLERS", {"lookup": (mock_handler, False)}
+        ), patch.dict(
+            "tools.router._ARGUMENT_SPECS",
+            {"lookup": (frozenset({"limit"}), {"limit": json_type})},
+        ):
+            rejected = await handle_tool_call("lookup", {"limit": True})
+            accepted = await handle_tool_call("lookup", {"limit": 3})
+
+        assert rejected == (
+            f"Error executing lookup: argument limit must be of type {json_type}"
+        )
+        assert accepted == "result"
+        mock_handler.assert_awaited_once_with(limit=3)
+
+    def test_specs_cover_every_tool(self):
+        """Should compile an argument spec for every defined tool."""
+        from tools import TOOLS
+        from tools.router import _ARGUMENT_SPECS
 
-                # Verify callback was NOT passed
-                mock_handler.assert_called_once()
-                call_kwargs = mock_handler.call_args.kwargs
-                assert "on_agent_activity" not in call_kwargs
+        assert _ARGUMENT_SPECS.keys() == {tool["name"] for tool in TOOLS}
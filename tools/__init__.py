@@ -1,5 +1,5 @@
 from .definitions import TOOLS
-from .router import handle_tool_call
+from .router import TOOLS_USING_DATABASE, handle_tool_call
 
-__all__ = ["TOOLS", "handle_tool_call"]
+__all__ = ["TOOLS", "TOOLS_USING_DATABASE", "handle_tool_call"]
 
@@ -1,19 +1,82 @@
 """Database query tool handler with SQL reflection pattern."""
 
-import json
+import asyncio
+import os
 from typing import Callable
 
-from database import execute_query
+import orjson
+
+from database import aexecute_query, is_select_query
 from database.models import SCHEMA
+from agent.semantic_cache import get_semantic_cache
+from agent.sql_static_check import check_sql
 from agent.sql_generator import SQLGeneratorAgent
 from agent.sql_reviewer import SQLReviewerAgent
 
 
 MAX_RETRIES = 4
+NOT_SELECT_FEEDBACK = (
+    "Query error: Only SELECT queries are allowed. "
+    "Please generate a valid SELECT query."
+)
 
 # Callback type for agent activity notifications
 AgentCallback = Callable[[str, str, dict], None]
 
+# Shared SQL agents (initialized lazily)
+_generator: SQLGeneratorAgent | None = None
+_reviewer: SQLReviewerAgent | None = None
+
+
+def _get_agents() -> tuple[SQLGeneratorAgent, SQLReviewerAgent]:
+    """Get the shared SQL generator and reviewer, creating them on first use."""
+    global _generator, _reviewer
+    if _generator is None or _reviewer is None:
+        _generator = SQLGeneratorAgent(semantic_cache=get_semantic_cache())
+        _reviewer = SQLReviewerAgent()
+    return _generator, _reviewer
+
+
+def _speculation_enabled() -> bool:
+    """
+    Check whether alternative queries are generated during review.
+
+    Speculation hides a generator round trip whenever a query is rejected,
+    at the cost of a wasted generation when it is approved. As the
+    alternative is generated without the reviewer's feedback, it is often
+    the query under review again, so it is off unless
+    SQL_SPECULATION_ENABLED=true.
+    """
+    return os.getenv("SQL_SPECULATION_ENABLED", "false").lower() == "true"
+
+
+def _give_up(
+    on_agent_activity: AgentCallback | None, attempt: int, reason: str
+) -> None:
+    """Notify that retries stopped early because they made no progress."""
+    if on_agent_activity:
+        on_agent_activity(
+            "Database", "giving_up", {"attempt": attempt + 1, "reason": reason}
+        )
+
+
+def _discard(task: asyncio.Task | None) -> None:
+    """Cancel a speculative task and silence any error it ended with."""
+    if task is not None:
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        task.cancel()
+
+
+async def _candidate(task: asyncio.Task | None, rejected_sql: str) -> str | None:
+    """Return a speculative query if it finished and differs from rejected_sql."""
+    if task is None:
+        return None
+    try:
+        sql = await task
+    except Exception:
+        return None
+    return sql if sql.split() != rejected_sql.split() else None
+
 
 async def query_orders_database(
     query: str,
@@ -23,7 +86,13 @@ async def query_orders_database(
     Execute a SQL query against the orders database using the reflection pattern.
 
     Uses SQLGeneratorAgent to generate SQL and SQLReviewerAgent to validate,
-    with up to MAX_RETRIES attempts if the query needs correction.
+    with up to MAX_RETRIES attempts if the query needs correction. Queries
+    that don't compile against the schema are sent back to the generator
+    without running them or calling the reviewer. With speculation enabled,
+    an alternative is generated while a query is under review, so a
+    rejection can move straight on to a different query. Retries stop early
+    when the generator repeats its last query or the same feedback comes
+    back twice.
 
     Args:
         query: Natural language question to answer
@@ -32,15 +101,43 @@ async def query_orders_database(
     Returns:
         JSON formatted query results or error message
     """
-    generator = SQLGeneratorAgent(on_activity=on_agent_activity)
-    reviewer = SQLReviewerAgent(on_activity=on_agent_activity)
+    generator, reviewer = _get_agents()
     feedback: str | None = None
     last_result: str = "No results found."
+    next_sql: str | None = None
+    previous_feedback: str | None = None
+    previous_sql: str | None = None
 
     for attempt in range(MAX_RETRIES):
+        # The same feedback twice in a row means the generator is stuck, and
+        # further attempts would fail the same way
+        if feedback is not None and feedback == previous_feedback:
+            _give_up(on_agent_activity, attempt, "repeated feedback")
+            break
+        previous_feedback = feedback
+
+        speculative: asyncio.Task | None = None
         try:
-            # Generate SQL query
-            raw_sql = await generator.generate(query, SCHEMA, feedback)
+            # Generate SQL query, unless a speculative one is ready to try
+            raw_sql = next_sql or await generator.generate(
+                query, SCHEMA, feedback, on_activity=on_agent_activity
+            )
+            next_sql = None
+
+            # A regenerated copy of the last query would meet the same fate
+            if previous_sql is not None and raw_sql.split() == previous_sql.split():
+                _give_up(on_agent_activity, attempt, "repeated query")
+                break
+            previous_sql = raw_sql
+
+            # Reject non-SELECT queries and queries that don't compile
+            # before running or reviewing them
+            if not is_select_query(raw_sql):
+                feedback = NOT_SELECT_FEEDBACK
+                continue
+            feedback = check_sql(raw_sql, SCHEMA)
+            if feedback:
+                continue
 
             # Notify about SQL execution
             if on_agent_activity:
@@ -50,29 +147,46 @@ async def query_orders_database(
                     {"sql": raw_sql, "attempt": attempt + 1},
                 )
 
-            # Execute the query
-            results = execute_query(raw_sql)
+            # Execute the query off the event loop so concurrent tools keep running
+            results = await aexecute_query(raw_sql)
 
             if not results:
                 result_str = "No results found."
             else:
-                result_str = json.dumps(results, indent=2, default=str)
+                result_str = orjson.dumps(
+                    results, default=str, option=orjson.OPT_INDENT_2
+                ).decode()
 
             last_result = result_str
 
-            # Review the query and results
-            feedback = await reviewer.review(query, SCHEMA, raw_sql, result_str)
+            # Review the query and results, generating an alternative query
+            # in parallel in case this one is rejected. It reports no
+            # activity, as it is thrown away whenever the query is approved.
+            if attempt + 1 < MAX_RETRIES and _speculation_enabled():
+                speculative = asyncio.create_task(
+                    generator.generate(query, SCHEMA, on_activity=None)
+                )
+            feedback = await reviewer.review(
+                query, SCHEMA, raw_sql, result_str, attempt, on_agent_activity
+            )
 
             # If no feedback, the query is correct
             if feedback is None:
+                await generator.remember(query, SCHEMA, raw_sql)
                 return result_str
 
+            # Try the alternative next if it isn't the rejected query again
+            next_sql = await _candidate(speculative, raw_sql)
+            speculative = None
+
         except ValueError as e:
             # Query validation error (e.g., not a SELECT query)
             feedback = f"Query error: {str(e)}. Please generate a valid SELECT query."
         except Exception as e:
             # Database execution error
             feedback = f"Database error: {str(e)}. Please fix the SQL syntax."
+        finally:
+            _discard(speculative)
 
-    # Return the last result after max retries
+    # Return the last result after max retries or giving up
     return last_result
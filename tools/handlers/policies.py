@@ -1,22 +1,101 @@
 """Policy search tool handler."""
 
-from rag import PolicyStore
+import asyncio
+import re
+import threading
+from collections import OrderedDict
 
+from rag import PolicyStore, get_policy_store as get_shared_policy_store
+
+
+N_RESULTS = 3
+MAX_CACHED_ANSWERS = 512
+RESULT_SEPARATOR = "\n\n---\n\n"
+
+# How long the first search of a batch waits for concurrent ones to join it
+SEARCH_BATCH_WINDOW_SECONDS = 0.005
 
 # Global policy store instance (initialized lazily)
 _policy_store: PolicyStore | None = None
+_policy_store_lock = threading.Lock()
+
+# Questions waiting for the next batched search, with their result futures
+_pending: list[tuple[str, asyncio.Future[list]]] = []
+
+# Running batch tasks, referenced so they aren't garbage collected
+_batch_tasks: set[asyncio.Task] = set()
+
+# Recent formatted answers keyed by store version and normalized question,
+# in LRU order
+_answers: OrderedDict[tuple[int, str], str] = OrderedDict()
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def _normalize(question: str) -> str:
+    """Normalize a question so case, punctuation and spacing don't matter."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", question.lower()).split())
 
 
 def get_policy_store() -> PolicyStore:
-    """Get or initialize the policy store."""
+    """Get the shared policy store, loading documents if it is empty."""
     global _policy_store
     if _policy_store is None:
-        _policy_store = PolicyStore()
-        if _policy_store.is_empty():
-            _policy_store.load_documents()
+        # May be first called from worker threads, so only one loads
+        with _policy_store_lock:
+            if _policy_store is None:
+                store = get_shared_policy_store()
+                if store.is_empty():
+                    store.load_documents()
+                _policy_store = store
     return _policy_store
 
 
+async def _run_batch() -> None:
+    """Search every pending question in one search_many call."""
+    global _pending
+    # Questions asked during the window are appended to this same list
+    batch = _pending
+    try:
+        await asyncio.sleep(SEARCH_BATCH_WINDOW_SECONDS)
+        _pending = []
+        store = get_policy_store()
+        results = await asyncio.to_thread(
+            store.search_many, [question for question, _ in batch], N_RESULTS
+        )
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+    else:
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    finally:
+        # Never leave a question waiting when the batch itself is cancelled
+        if _pending is batch:
+            _pending = []
+        for _, future in batch:
+            future.cancel()
+
+
+async def _search(question: str) -> list:
+    """
+    Search policies, coalescing concurrent questions into one batch.
+
+    The first question of a batch waits SEARCH_BATCH_WINDOW_SECONDS for
+    others, such as sibling tool calls of the same round, so they all share
+    one embedding request and collection query off the event loop.
+    """
+    future: asyncio.Future[list] = asyncio.get_running_loop().create_future()
+    _pending.append((question, future))
+    if len(_pending) == 1:
+        task = asyncio.create_task(_run_batch())
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+    return await future
+
+
 async def search_policies(question: str) -> str:
     """
     Search company policies for relevant information.
@@ -27,16 +106,27 @@ async def search_policies(question: str) -> str:
     Returns:
         Formatted policy results or error message
     """
-    store = get_policy_store()
-    results = store.search(question, n_results=3)
+    # Repeated questions skip the batch window, search and formatting.
+    # Reloading the store changes its version, so stale answers miss.
+    # Opening and loading the store blocks, so the first call does it off
+    # the event loop.
+    store = _policy_store or await asyncio.to_thread(get_policy_store)
+    key = (store.version, _normalize(question))
+    if key in _answers:
+        _answers.move_to_end(key)
+        return _answers[key]
 
-    if not results:
-        return "No relevant policies found."
+    results = await _search(question)
 
-    formatted = []
-    for doc in results:
-        formatted.append(
+    if not results:
+        answer = "No relevant policies found."
+    else:
+        answer = RESULT_SEPARATOR.join(
             f"**{doc['title']}** (distance: {doc['distance']:.2f})\n{doc['content']}"
+            for doc in results
         )
 
-    return "\n\n---\n\n".join(formatted)
+    _answers[key] = answer
+    while len(_answers) > MAX_CACHED_ANSWERS:
+        _answers.popitem(last=False)
+    return answer
@@ -1,21 +1,86 @@
 """Tool routing and execution."""
 
+import asyncio
 from typing import Callable, Awaitable
 
+import orjson
+
+from .definitions import TOOLS
 from .handlers import query_orders_database, search_policies
 
 
 # Callback type for agent activity notifications
 AgentCallback = Callable[[str, str, dict], None]
 
-# Registry mapping tool names to handler functions
-TOOL_HANDLERS: dict[str, Callable[..., Awaitable[str]]] = {
-    "query_orders_database": query_orders_database,
-    "search_policies": search_policies,
+# Registry mapping tool names to their handler function and whether the
+# handler takes the agent activity callback, so a call needs one lookup
+TOOL_HANDLERS: dict[str, tuple[Callable[..., Awaitable[str]], bool]] = {
+    "query_orders_database": (query_orders_database, True),
+    "search_policies": (search_policies, False),
+}
+
+# Tools that run queries against the orders database
+TOOLS_USING_DATABASE = {"query_orders_database"}
+
+# Result returned to the model when a tool call fails
+_ERROR_RESULT = "Error executing {}: {}"
+
+# Python types of the JSON schema types used by tool parameters
+_JSON_TYPES: dict[str, type | tuple[type, ...]] = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+# Required names and property types per tool, compiled once from the schemas
+_ARGUMENT_SPECS: dict[str, tuple[frozenset[str], dict[str, str]]] = {
+    tool["name"]: (
+        frozenset(tool["parameters"].get("required", ())),
+        {
+            key: prop["type"]
+            for key, prop in tool["parameters"]["properties"].items()
+        },
+    )
+    for tool in TOOLS
 }
 
-# Tools that support agent activity callbacks
-TOOLS_WITH_AGENT_CALLBACK = {"query_orders_database"}
+# Results of tool calls still running, keyed by tool name and canonical
+# arguments
+_inflight: dict[tuple[str, bytes], asyncio.Future[str]] = {}
+
+
+class _CallAbandoned(Exception):
+    """Raised to waiters of a shared tool call whose running caller was cancelled."""
+
+
+def _validate_arguments(name: str, arguments: dict) -> None:
+    """
+    Check tool arguments against the tool's parameter schema.
+
+    Raises:
+        ValueError: If an argument is missing, unexpected or of the wrong type
+    """
+    spec = _ARGUMENT_SPECS.get(name)
+    if spec is None:
+        return
+    required, types = spec
+
+    if not isinstance(arguments, dict):
+        raise ValueError("arguments must be a JSON object")
+    missing = required - arguments.keys()
+    if missing:
+        raise ValueError(f"missing required arguments: {', '.join(sorted(missing))}")
+    for key, value in arguments.items():
+        if key not in types:
+            raise ValueError(f"unexpected argument: {key}")
+        # bool subclasses int, but JSON booleans are not numbers
+        if not isinstance(value, _JSON_TYPES[types[key]]) or (
+            isinstance(value, bool) and types[key] != "boolean"
+        ):
+            raise ValueError(f"argument {key} must be of type {types[key]}")
 
 
 async def handle_tool_call(
@@ -26,6 +91,9 @@ async def handle_tool_call(
     """
     Route tool calls to their respective handlers.
 
+    A call identical to one still running waits for that call's result
+    instead of running the handler again.
+
     Args:
         name: Name of the tool to execute
         arguments: Arguments for the tool
@@ -37,13 +105,55 @@ async def handle_tool_call(
     Raises:
         ValueError: If the tool name is not recognized
     """
-    if name not in TOOL_HANDLERS:
+    entry = TOOL_HANDLERS.get(name)
+    if entry is None:
         raise ValueError(f"Unknown tool: {name}")
 
     try:
-        handler = TOOL_HANDLERS[name]
-        if name in TOOLS_WITH_AGENT_CALLBACK:
+        _validate_arguments(name, arguments)
+    except ValueError as e:
+        return _ERROR_RESULT.format(name, e)
+
+    key = (name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS))
+
+    # Identical calls made while one is running, such as duplicate tool
+    # calls of one round, wait for its result instead of running it again.
+    # Shielded so a waiter being cancelled doesn't cancel the shared call.
+    pending = _inflight.get(key)
+    if pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except _CallAbandoned:
+            # The caller running it was cancelled, which must not cancel
+            # this caller too, so the call is made again
+            return await handle_tool_call(name, arguments, on_agent_activity)
+
+    future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await _run_handler(name, entry, arguments, on_agent_activity)
+        future.set_result(result)
+    finally:
+        del _inflight[key]
+        if not future.done():
+            # Releases the waiters if this call was cancelled before
+            # finishing; marked retrieved so it isn't logged without waiters
+            future.set_exception(_CallAbandoned(name))
+            future.exception()
+    return result
+
+
+async def _run_handler(
+    name: str,
+    entry: tuple[Callable[..., Awaitable[str]], bool],
+    arguments: dict,
+    on_agent_activity: AgentCallback | None,
+) -> str:
+    """Run a tool handler, turning its failure into an error result."""
+    handler, takes_callback = entry
+    try:
+        if takes_callback:
             return await handler(**arguments, on_agent_activity=on_agent_activity)
         return await handler(**arguments)
     except Exception as e:
-        return f"Error executing {name}: {str(e)}"
+        return _ERROR_RESULT.format(name, e)
@@ -1,5 +1,5 @@
 from .cli import console, print_welcome, show_tool_call, show_agent_activity
-from .initialization import initialize
+from .initialization import initialize, initialize_async
 
 __all__ = [
     "console",
@@ -7,5 +7,6 @@ __all__ = [
     "show_tool_call",
     "show_agent_activity",
     "initialize",
+    "initialize_async",
 ]
 
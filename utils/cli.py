@@ -2,38 +2,61 @@
 
 from rich.console import Console
 from rich.panel import Panel
+from rich.text import Text
 
 
 console = Console()
 
+# Welcome banner with its markup parsed once, reused by every help command
+WELCOME_PANEL = Panel.fit(
+    Text.from_markup(
+        "[bold cyan]Customer Support Agent[/bold cyan]\n\n"
+        "Ask me about orders, products, stock levels, or company policies.\n\n"
+        "[dim]Commands:[/dim]\n"
+        "  [green]quit[/green] or [green]exit[/green] - Exit the agent\n"
+        "  [green]clear[/green] - Clear conversation history\n"
+        "  [green]help[/green] - Show this message"
+    ),
+    title="Welcome",
+    border_style="cyan",
+)
+
 
 def print_welcome() -> None:
     """Print welcome message and available commands."""
-    console.print(
-        Panel.fit(
-            "[bold cyan]Customer Support Agent[/bold cyan]\n\n"
-            "Ask me about orders, products, stock levels, or company policies.\n\n"
-            "[dim]Commands:[/dim]\n"
-            "  [green]quit[/green] or [green]exit[/green] - Exit the agent\n"
-            "  [green]clear[/green] - Clear conversation history\n"
-            "  [green]help[/green] - Show this message",
-            title="Welcome",
-            border_style="cyan",
-        )
-    )
+    console.print(WELCOME_PANEL)
     console.print()
 
 
+# Pre-parsed label of each tool, the argument shown under it and the
+# length that argument is truncated to
+TOOL_DISPLAY: dict[str, tuple[Text, str, int | None]] = {
+    "query_orders_database": (
+        Text.from_markup("  [dim]⚡ Tool: query_orders_database[/dim]"),
+        "query",
+        80,
+    ),
+    "search_policies": (
+        Text.from_markup("  [dim]📋 Tool: search_policies[/dim]"),
+        "question",
+        None,
+    ),
+}
+
+
 def show_tool_call(name: str, args: dict) -> None:
     """Display tool calls as they happen."""
-    if name == "query_orders_database":
-        query = args.get("query", "")
-        display = f"{query[:80]}..." if len(query) > 80 else query
-        console.print("  [dim]⚡ Tool: query_orders_database[/dim]")
-        console.print(f"     [dim italic]{display}[/dim italic]")
-    elif name == "search_policies":
-        console.print("  [dim]📋 Tool: search_policies[/dim]")
-        console.print(f"     [dim italic]{args.get('question', '')}[/dim italic]")
+    display_spec = TOOL_DISPLAY.get(name)
+    if display_spec is None:
+        return
+    label, key, limit = display_spec
+
+    value = str(args.get(key, ""))
+    if limit is not None:
+        value = value[:limit] + ("..." if len(value) > limit else "")
+    # One print renders and writes both lines. Built as Text so brackets in
+    # the argument aren't parsed as markup.
+    console.print(Text.assemble(label, "\n     ", (value, "dim italic")))
 
 
 def show_agent_activity(agent_name: str, action: str, details: dict) -> None:
@@ -1,21 +1,41 @@
 """System initialization utilities."""
 
-from database import init_database, seed_database
-from rag import PolicyStore
+import asyncio
+
+from database import bootstrap_database
 
 from .cli import console
 
 
-def initialize() -> None:
-    """Initialize database and vector store."""
-    with console.status("[cyan]Initializing database...[/cyan]"):
-        init_database()
-        seed_database()
+def _load_policy_store() -> int | None:
+    """Open the policy store, loading documents if it is empty."""
+    # Deferred so chromadb is only loaded once startup checks have passed
+    from rag import get_policy_store
+
+    store = get_policy_store()
+    if store.is_empty():
+        return store.load_documents()
+    return None
+
 
-    with console.status("[cyan]Loading policy documents...[/cyan]"):
-        store = PolicyStore()
-        if store.is_empty():
-            count = store.load_documents()
-            console.print(f"[dim]Loaded {count} policy document chunks[/dim]")
+async def initialize_async() -> None:
+    """
+    Initialize database and vector store concurrently.
 
+    Seeding SQLite is disk-bound and loading policies is mostly waiting on
+    the embeddings API, so the two run in parallel threads.
+    """
+    with console.status("[cyan]Initializing database and policies...[/cyan]"):
+        _, count = await asyncio.gather(
+            asyncio.to_thread(bootstrap_database),
+            asyncio.to_thread(_load_policy_store),
+        )
+
+    if count is not None:
+        console.print(f"[dim]Loaded {count} policy document chunks[/dim]")
     console.print("[green]✓[/green] System initialized\n")
+
+
+def initialize() -> None:
+    """Initialize database and vector store."""
+    asyncio.run(initialize_async())